@@ -1,6 +1,10 @@
 from csv import Error
 import os
 import pandas as pd
+from data_processing.cache import cached_read_csv
+from data_processing.geo import EU27, is_member
+from data_processing.groups import group_codes, group_mask, group_mean, top_k_mask
+from data_processing.publish import publish_csv
 
 
 class CSV_ENTRIES:
@@ -12,40 +16,9 @@ class CSV_ENTRIES:
     ANNUAL_EMISSION = "Annual CO₂ emissions"
 
 
-EU_COUNTRIES = [
-    "Austria",
-    "Belgium",
-    "Bulgaria",
-    "Croatia",
-    "Cyprus",
-    "Czech Republic",
-    "Denmark",
-    "Estonia",
-    "Finland",
-    "France",
-    "Germany",
-    "Greece",
-    "Hungary",
-    "Ireland",
-    "Italy",
-    "Latvia",
-    "Lithuania",
-    "Luxembourg",
-    "Malta",
-    "Netherlands",
-    "Poland",
-    "Portugal",
-    "Romania",
-    "Slovakia",
-    "Slovenia",
-    "Spain",
-    "Sweden",
-]
-
-
 def load_csv():
-    # Read and load the dataset from the csv file
-    return pd.read_csv(
+    # Read and load the dataset from the csv file (the parsed file is cached between the runs)
+    return cached_read_csv(
         os.getcwd()
         + "/assignment-1/datasets/original-datasets/co2-fossil-plus-land-use.csv",
         sep=",",
@@ -63,8 +36,8 @@ def store_csv_from_datframe(dataframe: pd.DataFrame):
         os.getcwd() + "/../web-application/public/datasets/assignment1/" + csv_name
     )
 
-    dataframe.to_csv(processed_dataset_path, index=False)
-    dataframe.to_csv(web_application_path, index=False)
+    # Serialized once, the second path is a hardlink of the first one
+    publish_csv(dataframe, [processed_dataset_path, web_application_path], index=False)
 
 
 if __name__ == "__main__":
@@ -79,7 +52,7 @@ if __name__ == "__main__":
     df = df[df[CSV_ENTRIES.YEAR] > 1954]
 
     # Remove the countries that are not in eu
-    df = df.query(f"{CSV_ENTRIES.ENTITY} in {EU_COUNTRIES}")
+    df = df[is_member(df[CSV_ENTRIES.ENTITY], EU27)]
 
     # This is only a guard that checks if the columns of interests have null values.
     hasNulls = df.isnull().sum()
@@ -97,14 +70,10 @@ if __name__ == "__main__":
         CSV_ENTRIES.ANNUAL_EMISSION_INCLUDING_LAND: "annual_emission_with_land_usage"
     })
 
-    # Compute the average `annual_emission_with_land_usage` per country, sorting them by average
-    # emission and taking only the first 10 country names
-    top10_emitter = df.groupby("country")["annual_emission_with_land_usage"]\
-        .mean()\
-        .sort_values(ascending=False)\
-        .head(10)\
-        .index.tolist()
-
-    df = df.query(f"country in {top10_emitter}")
+    # Compute the average `annual_emission_with_land_usage` per country and keep only the
+    # rows of the 10 countries with the highest average emission
+    countries = group_codes(df, ["country"])
+    average_emission = group_mean(countries, df["annual_emission_with_land_usage"])
+    df = df[group_mask(countries, top_k_mask(average_emission, 10))]
 
     store_csv_from_datframe(df)
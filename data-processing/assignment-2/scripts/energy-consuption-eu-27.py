@@ -1,48 +1,22 @@
 from csv import Error
 import os
 import pandas as pd
+from data_processing.cache import cached_read_csv
+from data_processing.geo import EU27, is_member
+from data_processing.metrics import Sum, evaluate
+from data_processing.publish import publish_csv
 
 class CSV_ENTRIES:
     ENTITY = "Entity"
     CODE = "Code"
     YEAR = "Year"
 
-EU_COUNTRIES = [
-    "Austria",
-    "Belgium",
-    "Bulgaria",
-    "Croatia",
-    "Cyprus",
-    "Czech Republic",
-    "Denmark",
-    "Estonia",
-    "Finland",
-    "France",
-    "Germany",
-    "Greece",
-    "Hungary",
-    "Ireland",
-    "Italy",
-    "Latvia",
-    "Lithuania",
-    "Luxembourg",
-    "Malta",
-    "Netherlands",
-    "Poland",
-    "Portugal",
-    "Romania",
-    "Slovakia",
-    "Slovenia",
-    "Spain",
-    "Sweden",
-]
-
 
 def load_csv():
-    # Read and load the dataset from the csv file
+    # Read and load the dataset from the csv file (the parsed file is cached between the runs)
     print("\n" + os.getcwd()
         + "/assignment-2/datasets/original-datasets/energy-consumption-by-source-and-country.csv")
-    return pd.read_csv(
+    return cached_read_csv(
         os.getcwd()
         + "/assignment-2/datasets/original-datasets/energy-consumption-by-source-and-country.csv",
         sep=",",
@@ -60,8 +34,8 @@ def store_csv_from_datframe(dataframe: pd.DataFrame):
         os.getcwd() + "/../web-application/public/datasets/assignment2/" + csv_name
     )
 
-    dataframe.to_csv(processed_dataset_path, index=False)
-    dataframe.to_csv(web_application_path, index=False)
+    # Serialized once, the second path is a hardlink of the first one
+    publish_csv(dataframe, [processed_dataset_path, web_application_path], index=False)
 
 
 if __name__ == "__main__":
@@ -71,7 +45,7 @@ if __name__ == "__main__":
     df = df.drop(CSV_ENTRIES.CODE, axis=1)
 
     # Remove the countries that are not in eu
-    df = df.query(f"{CSV_ENTRIES.ENTITY} in {EU_COUNTRIES}")
+    df = df[is_member(df[CSV_ENTRIES.ENTITY], EU27)]
 
     # Sort the dataframe by year
     df = df.sort_values(by=[CSV_ENTRIES.YEAR, CSV_ENTRIES.ENTITY])
@@ -84,6 +58,11 @@ if __name__ == "__main__":
     # Add a column for the total energy consumed
     # All the energy source columns are from the 3rd column onward
     energy_source_columns = df.columns[2:]  # Skip "Country" and "Year"
-    df["Total energy consumption - TWh"] = df[energy_source_columns].sum(axis=1)
+    df = evaluate(
+        df,
+        [Sum("Total energy consumption - TWh", energy_source_columns)],
+        entity="Country",
+        year=CSV_ENTRIES.YEAR,
+    )
 
     store_csv_from_datframe(df)
\ No newline at end of file
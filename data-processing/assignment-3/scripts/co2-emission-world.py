@@ -1,6 +1,11 @@
 import pandas as pd
 import os
 from csv import Error
+from data_processing.cache import cached_read_csv, memoize
+from data_processing.join import panel_join
+from data_processing.loader import load_many
+from data_processing.metrics import Ratio, evaluate
+from data_processing.publish import publish_csv
 
 class CSV_ENTRIES_FOSSIL:
     ENTITY = "Entity"
@@ -36,7 +41,7 @@ FILES = {
 # Load CSV
 def load_csv(file_key):
     file_path = os.path.join(DATA_PATH, FILES[file_key])
-    return pd.read_csv(file_path)
+    return cached_read_csv(file_path)
 
 def check_null(dataframe: pd.DataFrame):
     hasNulls = dataframe.isnull().sum()
@@ -55,16 +60,18 @@ def store_csv_from_datframe(dataframe: pd.DataFrame):
         os.getcwd() + "\\..\\..\\..\\web-application\\public\\datasets\\assignment3\\" + csv_name
     )
 
-    dataframe.to_csv(processed_dataset_path, index=False)
-    dataframe.to_csv(web_application_path, index=False)
+    # Serialized once, the second path is a hardlink of the first one
+    publish_csv(dataframe, [processed_dataset_path, web_application_path], index=False)
 
-def preprocess_and_merge_data():
-
-    # Load the datasets 
-    df_per_capita = load_csv("co2_emissions_per_capita")
-    df_fossil_land = load_csv("co2_fossil_plus_land_use")
-    df_land_area = load_csv("land_area_km")
-    df_total_emissions = load_csv("co2_total_emissions")
+@memoize
+def preprocess_and_merge_data(
+    df_per_capita: pd.DataFrame,
+    df_fossil_land: pd.DataFrame,
+    df_land_area: pd.DataFrame,
+    df_total_emissions: pd.DataFrame,
+) -> pd.DataFrame:
+    # Clean and merge the four datasets (the stage is memoized, it must not
+    # modify its arguments and the result is stored by the caller)
 
     # Manage null values 
 
@@ -137,16 +144,21 @@ def preprocess_and_merge_data():
     df_land_area = df_land_area[df_land_area["year"] > year]
     df_total_emissions = df_total_emissions[df_total_emissions["year"] > year]
 
-    # Merge on the coloumn `country_name` e `year`
-    merged_df = pd.merge(df_per_capita, df_fossil_land, on=["country_name", "year"], how="inner")
-    merged_df = pd.merge(merged_df, df_land_area, on=["country_name", "year"], how="inner")
-    merged_df = pd.merge(merged_df, df_total_emissions, on=["country_name", "year"], how="inner")
+    # Merge on the coloumn `country_name` e `year` (all the datasets in one pass)
+    merged_df = panel_join(
+        [df_per_capita, df_fossil_land, df_land_area, df_total_emissions],
+        on=["country_name", "year"],
+        how="inner",
+    )
 
     print(merged_df.head())
 
     # Calculate Density annual -> `annual_emission_density`
-    merged_df["annual_emission_density"] = (
-        merged_df["fossil_emissions"] / merged_df["land_area_km"]
+    merged_df = evaluate(
+        merged_df,
+        [Ratio("annual_emission_density", "fossil_emissions", "land_area_km")],
+        entity="country_name",
+        year="year",
     )
 
     # Select Final Coloumn 
@@ -162,7 +174,17 @@ def preprocess_and_merge_data():
     # Order based on year and country name 
     final_df = final_df.sort_values(by=["year", "country_name"])
 
-    store_csv_from_datframe(final_df)
+    return final_df
 
 if __name__ == "__main__":
-    preprocess_and_merge_data()
+    # Load the datasets 
+    frames = load_many({file_key: file_key for file_key in FILES}, load_csv)
+    print(frames.report())
+    df_per_capita = frames["co2_emissions_per_capita"]
+    df_fossil_land = frames["co2_fossil_plus_land_use"]
+    df_land_area = frames["land_area_km"]
+    df_total_emissions = frames["co2_total_emissions"]
+
+    final_df = preprocess_and_merge_data(df_per_capita, df_fossil_land, df_land_area, df_total_emissions)
+
+    store_csv_from_datframe(final_df)
@@ -1,9 +1,16 @@
-import csv
 import os
+import numpy as np
 import pandas as pd
 import sys
-sys.path.append('.\\original-datasets')
+from data_processing.density import density_grid, group_kde
+from data_processing.downsample import downsample_levels
+from data_processing.groups import group_codes, group_labels, group_mean, group_quantiles, group_sum
+from data_processing.join import panel_join
+from data_processing.publish import publish, publish_csv
+from data_processing.rollup import Rollup, period_start
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "original-datasets"))
 import country_indexes as countries
+from climate_cube import ClimateCube
 
 class CSV_ENTRIES:
     STATE_CODE = "state_code"
@@ -13,49 +20,201 @@ class CSV_ENTRIES:
     MONTH = "month"
     VALUE = "value"
 
-REGIONS = [
-    "Northeast Region",
-    "East North Central Region",
-    "Central Region",
-    "Southeast Region",
-    "West North Central Region",
-    "South Region",
-    "Southwest Region",
-    "Northwest Region",
-    "West Region",
-]
+# Layout of a climdiv record (see original-datasets/README_STRUCTURE):
+# every line has the same width, so the whole file can be viewed as a
+# (rows, line_width) byte matrix and each field is a column slice of it.
+STATE_CODE_FIELD = slice(0, 3)
+DIVISION_NUMBER_FIELD = slice(3, 4)
+ELEMENT_CODE_FIELD = slice(4, 6)
+YEAR_FIELD = slice(6, 10)
+VALUES_OFFSET = 10
+MONTHS = 12
+# Every value is written as "%7.2f", e.g. "  52.70" or " -99.90"
+VALUE_WIDTH = 7
+VALUE_DECIMALS = 2
+MISSING_VALUE = -9990  # -99.90 in hundredths
+
+# Number of records converted at once by `process_to_csv`, bounds the memory used
+CSV_CHUNK_ROWS = 100_000
+
+_SPACE, _MINUS, _DOT, _ZERO, _COMMA = (ord(c) for c in " -.0,")
+_BLANK = np.zeros(256, dtype=bool)
+_BLANK[list(b" \t\r")] = True
+# Byte -> digit value, blanks and signs are read as zeros
+_DIGIT_VALUE = np.zeros(256, dtype=np.uint8)
+_DIGIT_VALUE[list(b"0123456789")] = np.arange(10)
+
 
-def process_to_csv(input_file, output_file):
+def _read_records(input_file) -> np.ndarray:
+    # Read the whole file as a (rows, line_width) byte matrix and validate it
     if not os.path.exists(input_file):
         raise FileNotFoundError(f"Input file '{input_file}' does not exist.")
 
-    with open(input_file, 'r') as infile, open(output_file, 'w', newline='') as outfile:
-        writer = csv.writer(outfile)
-
-        # Scrittura dell'intestazione del CSV
-        writer.writerow(["state_code", "division_number", "element_code", "year", "month", "value"])
-
-        for line in infile:
-            # Parsing dei dati basato sulla posizione
-            state_code = line[0:3].strip()
-            division_number = line[3:4].strip()
-            element_code = line[4:6].strip()
-            year = int(line[6:10].strip())
-            values = line[10:].strip().split()
-
-            if len(values) != 12:
-                raise ValueError(f"La riga non contiene esattamente 12 valori: {line}")
-
-            # Creazione di un record per ogni mese
-            for month_index, value in enumerate(values, start=1):
-                writer.writerow([
-                    state_code,
-                    division_number,
-                    element_code,
-                    year,
-                    month_index,  # Mese (1-12)
-                    float(value) if value != '-99.90' else None  # Sostituisci -99.90 con None
-                ])
+    with open(input_file, "rb") as infile:
+        buffer = infile.read()
+
+    if not buffer.endswith(b"\n"):
+        buffer += b"\n"
+
+    line_width = buffer.index(b"\n") + 1
+    data = np.frombuffer(buffer, dtype=np.uint8)
+
+    # Every record must have the same width, otherwise the column slicing is not valid
+    if data.size % line_width != 0 or line_width <= VALUES_OFFSET + MONTHS * VALUE_WIDTH:
+        raise ValueError(f"Le righe non hanno tutte la stessa lunghezza: {input_file}")
+    data = data.reshape(-1, line_width)
+    wrong_width = np.flatnonzero(data[:, -1] != ord("\n"))
+    if wrong_width.size > 0:
+        raise ValueError(f"Le righe non hanno tutte la stessa lunghezza: {input_file} (riga {wrong_width[0] + 1})")
+
+    # Check that every row contains exactly 12 values: count the tokens (a non blank
+    # byte preceded by a blank one) in the values area of each record
+    blank = np.ones((data.shape[0], line_width - VALUES_OFFSET), dtype=bool)
+    blank[:, 1:] = _BLANK[data[:, VALUES_OFFSET:-1]]
+    tokens = np.count_nonzero(~blank[:, 1:] & blank[:, :-1], axis=1)
+    invalid = np.flatnonzero(tokens != MONTHS)
+    if invalid.size > 0:
+        line = data[invalid[0]].tobytes().decode()
+        raise ValueError(f"La riga non contiene esattamente 12 valori: {line}")
+
+    # The 12 values have to be aligned on the fixed "%7.2f" columns
+    fields = _value_fields(data)
+    if (fields[:, :, VALUE_WIDTH - VALUE_DECIMALS - 1] != _DOT).any():
+        raise ValueError(f"I valori non sono nel formato a larghezza fissa atteso: {input_file}")
+
+    return data
+
+
+def _value_fields(data: np.ndarray) -> np.ndarray:
+    # View the values area of the records as a (rows, 12, 7) byte matrix
+    return data[:, VALUES_OFFSET:VALUES_OFFSET + MONTHS * VALUE_WIDTH].reshape(-1, MONTHS, VALUE_WIDTH)
+
+
+def _digits_to_int(field: np.ndarray, dtype) -> np.ndarray:
+    # Convert a matrix of right aligned ASCII digits (last axis) to integers,
+    # blanks and the minus sign count as zeros, the sign is handled by the caller
+    digits = _DIGIT_VALUE[field]
+    result = digits[..., 0].astype(np.int32)
+    for position in range(1, field.shape[-1]):
+        result *= 10
+        result += digits[..., position]
+    return result.astype(dtype, copy=False)
+
+
+def _parse_hundredths(fields: np.ndarray) -> np.ndarray:
+    # Parse the (rows, 12, 7) value fields as integer hundredths
+    point = VALUE_WIDTH - VALUE_DECIMALS - 1
+    hundredths = _digits_to_int(fields[..., :point], np.int32) * 10 ** VALUE_DECIMALS
+    hundredths += _digits_to_int(fields[..., point + 1:], np.int32)
+    negative = (fields[..., :point] == _MINUS).any(axis=-1)
+    np.negative(hundredths, out=hundredths, where=negative)
+    return hundredths
+
+
+def parse_climdiv(input_file) -> dict:
+    """
+    Parse a NOAA climdiv fixed-width file into NumPy arrays in a single pass.
+
+    The file is read as one byte buffer and viewed as a matrix with one row per
+    record, the header fields and the 12 monthly values are decoded with integer
+    arithmetic on the digit columns. The `-99.90` sentinel is mapped to NaN.
+
+    :param input_file: The path of the climdiv file.
+    :return: A dict with the `state_code`, `division_number`, `element_code` and `year`
+        arrays (one entry per row) and `value`, a (rows, 12) float array.
+    """
+
+    data = _read_records(input_file)
+
+    hundredths = _parse_hundredths(_value_fields(data))
+    values = hundredths / 10 ** VALUE_DECIMALS
+    values[hundredths == MISSING_VALUE] = np.nan
+
+    return {
+        CSV_ENTRIES.STATE_CODE: _digits_to_int(data[:, STATE_CODE_FIELD], np.int16),
+        CSV_ENTRIES.DIVISION_NUMBER: _digits_to_int(data[:, DIVISION_NUMBER_FIELD], np.int8),
+        CSV_ENTRIES.ELEMENT_CODE: _digits_to_int(data[:, ELEMENT_CODE_FIELD], np.int8),
+        CSV_ENTRIES.YEAR: _digits_to_int(data[:, YEAR_FIELD], np.int16),
+        CSV_ENTRIES.VALUE: values,
+    }
+
+
+def climdiv_to_dataframe(parsed: dict) -> pd.DataFrame:
+    """
+    Convert the arrays returned by `parse_climdiv` into the long format
+    (one row per month) used by the rest of the pipeline.
+
+    :param parsed: The dict returned by `parse_climdiv`.
+    :return: The dataframe with the columns of `CSV_ENTRIES`.
+    """
+
+    values = parsed[CSV_ENTRIES.VALUE]
+    rows = values.shape[0]
+
+    return pd.DataFrame({
+        CSV_ENTRIES.STATE_CODE: np.repeat(parsed[CSV_ENTRIES.STATE_CODE], MONTHS),
+        CSV_ENTRIES.DIVISION_NUMBER: np.repeat(parsed[CSV_ENTRIES.DIVISION_NUMBER], MONTHS),
+        CSV_ENTRIES.ELEMENT_CODE: np.repeat(parsed[CSV_ENTRIES.ELEMENT_CODE], MONTHS),
+        CSV_ENTRIES.YEAR: np.repeat(parsed[CSV_ENTRIES.YEAR], MONTHS),
+        CSV_ENTRIES.MONTH: np.tile(np.arange(1, MONTHS + 1, dtype=np.int8), rows),  # Mese (1-12)
+        CSV_ENTRIES.VALUE: values.ravel(),
+    })
+
+
+def _records_to_csv_bytes(data: np.ndarray) -> bytes:
+    # Build the long format csv rows directly from the bytes of the records.
+    # Every output row is laid out in a fixed width matrix where the bytes to
+    # skip are set to 0, the zeros are then dropped in a single mask operation.
+    rows = data.shape[0] * MONTHS
+    fields = [
+        data[:, STATE_CODE_FIELD],
+        data[:, DIVISION_NUMBER_FIELD],
+        data[:, ELEMENT_CODE_FIELD],
+        data[:, YEAR_FIELD],
+    ]
+    width = sum(field.shape[1] + 1 for field in fields) + 3 + VALUE_WIDTH + 2
+    out = np.zeros((data.shape[0], MONTHS, width), dtype=np.uint8)
+
+    column = 0
+    for field in fields:
+        out[:, :, column:column + field.shape[1]] = np.where(_BLANK[field], 0, field)[:, None, :]
+        column += field.shape[1]
+        out[:, :, column] = _COMMA
+        column += 1
+
+    # Mese (1-12)
+    months = np.array([list(b"%-2d" % month) for month in range(1, MONTHS + 1)], dtype=np.uint8)
+    out[:, :, column:column + 2] = np.where(months == _SPACE, 0, months)
+    out[:, :, column + 2] = _COMMA
+    column += 3
+
+    # Same text that `float` would give back: no leading blanks and only one
+    # trailing zero after the decimal point ("  52.70" -> "52.7"), empty if missing
+    values = _value_fields(data)
+    text = np.where(_BLANK[values], 0, values)
+    last = text[..., -1]
+    last[(last == _ZERO) & (text[..., -2] != _DOT)] = 0
+    text[_parse_hundredths(values) == MISSING_VALUE] = 0
+    out[:, :, column:column + VALUE_WIDTH] = text
+    out[:, :, column + VALUE_WIDTH:] = list(b"\r\n")
+
+    out = out.reshape(rows, width)
+    return out[out != 0].tobytes()
+
+
+def process_to_csv(input_file, *output_files):
+    # Il file di input viene letto e convertito una sola volta, anche con piu' destinazioni
+    data = _read_records(input_file)
+
+    def write(path):
+        with open(path, "wb") as outfile:
+            # Scrittura dell'intestazione del CSV
+            outfile.write(b"state_code,division_number,element_code,year,month,value\r\n")
+
+            for start in range(0, data.shape[0], CSV_CHUNK_ROWS):
+                outfile.write(_records_to_csv_bytes(data[start:start + CSV_CHUNK_ROWS]))
+
+    publish(write, output_files)
 
 # Specifica le cartelle di destinazione
 pre_processing_folder = ".\\processed-datasets\\"
@@ -75,6 +234,42 @@ csv_names = [
     "Avg.csv"
 ]
 
+# Elementi del cubo, nello stesso ordine dei file di input
+elements = [
+    "max",
+    "min",
+    "avg"
+]
+
+cube_name = "climate-cube.npy"
+
+# Colonne e nome del file con i tre elementi insieme (opzione --wide)
+wide_columns = [
+    "tmax",
+    "tmin",
+    "tavg"
+]
+wide_csv_name = "Temperatures.csv"
+
+# File pre-aggregati dei grafici (radar e ridgeline), piccoli rispetto ai file completi
+radar_csv_name = "Radar.csv"
+ridgeline_csv_name = "Ridgeline.csv"
+# Periodo di riferimento delle normali mensili del radar
+CLIMATOLOGY_BASELINE = (1991, 2020)
+# Gli elementi del ridgeline e i quantili delle distribuzioni per decennio
+RIDGELINE_ELEMENTS = ["min", "max"]
+RIDGELINE_QUANTILES = {"q25": 0.25, "median": 0.5, "q75": 0.75}
+CHART_DECIMALS = 2
+# Densità (kernel gaussiano) del ridgeline su una griglia comune: banda in °F e punti
+density_csv_name = "Ridgeline-density.csv"
+KDE_BANDWIDTH = 1.5
+KDE_GRID_POINTS = 100
+DENSITY_DECIMALS = 5
+# Livelli di dettaglio (LTTB) delle serie mensili di ogni stato, in punti per serie:
+# un file per elemento e livello (es. Avg-200.csv), il livello completo è il file
+# dell'elemento (Avg.csv)
+LOD_LEVELS = [200, 800]
+
 DATA_PATH = os.getcwd() + "\\processed-datasets\\"
 
 # Load CSV
@@ -89,80 +284,146 @@ def store_csv_from_datframe(dataframe: pd.DataFrame, csv_name):
     
     web_application_path = os.path.join(output_folder, csv_name)
 
-    dataframe.to_csv(processed_dataset_path, index=False)
-    dataframe.to_csv(web_application_path, index=False)
+    # Serialized once, the second path is a hardlink of the first one
+    publish_csv(dataframe, [processed_dataset_path, web_application_path], index=False)
+
+def build_cube() -> ClimateCube:
+    # Parse the input files once and store them in the element x state x year x month cube
+    parsed_elements = {
+        element: parse_climdiv(input_file)
+        for element, input_file in zip(elements, input_files)
+    }
+    return ClimateCube.create(os.path.join(pre_processing_folder, cube_name), parsed_elements)
+
+def combine_and_merge_data(cube: ClimateCube) -> pd.DataFrame:
+    # Single frame (state, year, month) -> tmax, tmin, tavg: the country join
+    # and the filters are done once for the three elements
+    df = cube.to_wide_dataframe().rename(columns=dict(zip(elements, wide_columns)))
 
-def process_and_merge_data():
-    # Load the datasets 
-    df_max = load_csv(csv_names[0])
-    df_min = load_csv(csv_names[1])
-    df_avg = load_csv(csv_names[2])
+    print(df.shape)
 
-    # DROP DIVISION_NUMBER Coloum
-    df_max = df_max.drop(CSV_ENTRIES.DIVISION_NUMBER, axis=1)
-    df_min = df_min.drop(CSV_ENTRIES.DIVISION_NUMBER, axis=1)
-    df_avg = df_avg.drop(CSV_ENTRIES.DIVISION_NUMBER, axis=1)
+    # Keep only the states and the nation (no regions, no codes without a name)
+    # and attach the country name, both are lookups by state code
+    df = df[countries.get_mask(df["state_code"], countries.IS_STATE | countries.IS_NATIONAL)]
+    df = df.assign(country=countries.get_names(df["state_code"]))
 
-    print(df_max.shape)
+    return df
 
-    # Convert the array of objects into a Dataframe
-    df_countries = pd.DataFrame(countries.get_sorted_countries())
+def split_combined_data(df: pd.DataFrame):
+    # One frame per element with the published columns, the rows in which
+    # the value of that element is null are dropped
+    return tuple(
+        df[["state_code", "year", "month", column, "country"]]
+        .dropna(subset=[column])
+        .rename(columns={column: CSV_ENTRIES.VALUE})
+        for column in wide_columns
+    )
 
-    # Merge on 'index' from df_countries and 'state_code' from the csv files
-    df_max = pd.merge(df_max, df_countries, left_on="state_code", right_on="index", how="left")
-    df_min = pd.merge(df_min, df_countries, left_on="state_code", right_on="index", how="left")
-    df_avg = pd.merge(df_avg, df_countries, left_on="state_code", right_on="index", how="left")
+def radar_climatology(df: pd.DataFrame) -> pd.DataFrame:
+    # The monthly normals of every state (one row per state and month, a column per
+    # element), what the radar draws without the whole history
+    keys = ["state_code", "country"]
+    frames = [
+        Rollup.from_monthly(df, column, keys)
+        .normals(*CLIMATOLOGY_BASELINE)
+        .drop(columns="count")
+        .rename(columns={column: element})
+        for column, element in zip(wide_columns, elements)
+    ]
+    return panel_join(frames, on=keys + [CSV_ENTRIES.MONTH], how="outer").round(CHART_DECIMALS)
 
-    # Keep only the states, nation and rempoves rows with empty country name
-    index = 110
-    df_max = df_max[df_max["state_code"] <= index]
-    df_min = df_min[df_min["state_code"] <= index]
-    df_avg = df_avg[df_avg["state_code"] <= index]
+def ridgeline_distributions(df: pd.DataFrame) -> pd.DataFrame:
+    # The distribution of the monthly values of every state and decade (the ridges),
+    # for the minimum and maximum temperatures: count, mean, extremes and quartiles
+    df = df.assign(decade=period_start(df[CSV_ENTRIES.YEAR]))
+    groups = group_codes(df, ["state_code", "country", "decade"])
 
-    df_max = df_max[~df_max["country"].isin(REGIONS)]
-    df_min = df_min[~df_min["country"].isin(REGIONS)]
-    df_avg = df_avg[~df_avg["country"].isin(REGIONS)]
+    frames = []
+    for element in RIDGELINE_ELEMENTS:
+        values = df[wide_columns[elements.index(element)]]
+        quantiles = group_quantiles(groups, values, [0.0, *RIDGELINE_QUANTILES.values(), 1.0])
+        frame = group_labels(groups).assign(
+            element=element,
+            count=group_sum(groups, values.notna()).astype(np.int64),
+            mean=group_mean(groups, values),
+            min=quantiles[:, 0],
+            **{name: quantiles[:, i] for i, name in enumerate(RIDGELINE_QUANTILES, start=1)},
+            max=quantiles[:, -1],
+        )
+        frames.append(frame[frame["count"] > 0])
 
-    # Drop rows with NaN in 'country'
-    df_max = df_max.dropna(subset=["country"])
-    df_min = df_min.dropna(subset=["country"])
-    df_avg = df_avg.dropna(subset=["country"])
+    # By state, decade and element
+    df = pd.concat(frames, ignore_index=True)
+    df = df.sort_values(["state_code", "decade", "element"], kind="stable", ignore_index=True)
+    return df.round(CHART_DECIMALS)
 
-    # Drop the rows in which the "value" is null
-    df_max = df_max.dropna(subset=["value"])
-    df_min = df_min.dropna(subset=["value"])
-    df_avg = df_avg.dropna(subset=["value"])
+def ridgeline_densities(
+    df: pd.DataFrame,
+    bandwidth: float = KDE_BANDWIDTH,
+    points: int = KDE_GRID_POINTS,
+) -> pd.DataFrame:
+    # The density curves of the ridges, one row per state, decade and element and one
+    # column per point of the grid (the header is the grid), so the chart draws them
+    # without estimating the densities from the monthly rows
+    df = df.assign(decade=period_start(df[CSV_ENTRIES.YEAR]))
+    groups = group_codes(df, ["state_code", "country", "decade"])
+    columns = [wide_columns[elements.index(element)] for element in RIDGELINE_ELEMENTS]
+    grid = density_grid(df[columns].to_numpy().ravel(), bandwidth, points)
 
-    # Drop the redundant 'index' column
-    df_max.drop(columns=["index"], inplace=True)
-    df_min.drop(columns=["index"], inplace=True)
-    df_avg.drop(columns=["index"], inplace=True)
+    frames = []
+    for element, column in zip(RIDGELINE_ELEMENTS, columns):
+        densities = group_kde(groups, df[column], grid, bandwidth)
+        frame = pd.concat(
+            [
+                group_labels(groups).assign(element=element),
+                pd.DataFrame(densities, columns=[f"{x:.2f}" for x in grid]),
+            ],
+            axis=1,
+        )
+        frames.append(frame[~np.isnan(densities).all(axis=1)])
 
-    # DROP ELEMENT_CODE Coloum
-    df_max = df_max.drop(CSV_ENTRIES.ELEMENT_CODE, axis=1)
-    df_min = df_min.drop(CSV_ENTRIES.ELEMENT_CODE, axis=1)
-    df_avg = df_avg.drop(CSV_ENTRIES.ELEMENT_CODE, axis=1)
+    df = pd.concat(frames, ignore_index=True)
+    df = df.sort_values(["state_code", "decade", "element"], kind="stable", ignore_index=True)
+    return df.round(DENSITY_DECIMALS)
 
-    print(df_max.head())
+def series_levels(df: pd.DataFrame, levels: list = LOD_LEVELS) -> pd.DataFrame:
+    # The downsampled monthly series of every state of an element, the months are
+    # numbered from the first one so the points are equally spaced
+    df = df.assign(time=df[CSV_ENTRIES.YEAR] * MONTHS + df[CSV_ENTRIES.MONTH] - 1)
+    return downsample_levels(df, ["state_code"], "time", CSV_ENTRIES.VALUE, levels).drop(columns="time")
 
-    return df_max, df_min, df_avg
+def export_chart_data(df: pd.DataFrame):
+    # Stage after `combine_and_merge_data`: the small files of the radar and ridgeline
+    # charts and the levels of detail of the line chart, published next to the
+    # complete ones
+    store_csv_from_datframe(radar_climatology(df), radar_csv_name)
+    store_csv_from_datframe(ridgeline_distributions(df), ridgeline_csv_name)
+    store_csv_from_datframe(ridgeline_densities(df), density_csv_name)
+    for df_element, csv_name in zip(split_combined_data(df), csv_names):
+        df_levels = series_levels(df_element)
+        for level in LOD_LEVELS:
+            df_level = df_levels[df_levels["level"] == str(level)].drop(columns="level")
+            store_csv_from_datframe(df_level, csv_name.replace(".csv", f"-{level}.csv"))
 
 if __name__ == "__main__":
-    for input_file, csv_name in zip(input_files, csv_names):
-        # Crea i percorsi completi per entrambi i file CSV di output
-        pre_processing_output_file = os.path.join(pre_processing_folder, csv_name)
-        web_app_output_file = os.path.join(output_folder, csv_name)
-        
-        try:
-            # Salva i dati in entrambe le cartelle
-            process_to_csv(input_file, pre_processing_output_file)
-            process_to_csv(input_file, web_app_output_file)
-            print(f"Dati processati e salvati in formato CSV: {pre_processing_output_file} e {web_app_output_file}")
-        except (FileNotFoundError, ValueError) as e:
-            print(f"Errore con il file {input_file}: {e}")
-    
-    df_max, df_min, df_avg = process_and_merge_data()
-    store_csv_from_datframe(df_max, csv_names[0])
-    store_csv_from_datframe(df_min, csv_names[1])
-    store_csv_from_datframe(df_avg, csv_names[2])
+    try:
+        # Parse the text files once, the following stages read from the cube
+        cube = build_cube()
+        print(f"Cubo salvato in: {os.path.join(pre_processing_folder, cube_name)}")
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Errore durante la creazione del cubo: {e}")
+        sys.exit(1)
+
+    df = combine_and_merge_data(cube)
+
+    if "--wide" in sys.argv[1:]:
+        # One wide file with the three elements
+        store_csv_from_datframe(df, wide_csv_name)
+    else:
+        df_max, df_min, df_avg = split_combined_data(df)
+        store_csv_from_datframe(df_max, csv_names[0])
+        store_csv_from_datframe(df_min, csv_names[1])
+        store_csv_from_datframe(df_avg, csv_names[2])
 
+    # The small chart-ready files of the radar and ridgeline charts
+    export_chart_data(df)
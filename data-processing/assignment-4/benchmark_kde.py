@@ -0,0 +1,74 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_processing.density import density_grid, group_kde
+from data_processing.groups import group_codes
+from Preprocess_data import climdiv_to_dataframe, parse_climdiv
+
+# Benchmark of the batched kernel densities against one estimate per group
+##########################################################################
+
+CURRENT_DIRPATH = os.path.dirname(os.path.abspath(__file__))
+CLIMDIV_FILE = os.path.join(CURRENT_DIRPATH, "original-datasets", "climdiv-tmaxst-v1.0.0-20241205.txt")
+# The 48 contiguous states (climdiv codes 1 to 48) and the 13 decades from 1900 to 2020
+STATE_CODES = range(1, 49)
+FIRST_DECADE, LAST_DECADE = 1900, 2020
+BANDWIDTHS = [1.5, 3.0]
+GRID_POINTS = [100, 400]
+REPEAT = 5
+
+
+def load_dataset() -> pd.DataFrame:
+    df = climdiv_to_dataframe(parse_climdiv(CLIMDIV_FILE)).dropna(subset=["value"])
+    df = df.assign(decade=(df["year"] // 10) * 10)
+    selected = df["state_code"].isin(STATE_CODES) & df["decade"].between(FIRST_DECADE, LAST_DECADE)
+    return df[selected].reset_index(drop=True)
+
+
+def best_of(repeat, function, *args) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def loop_kde(df, grid, bandwidth):
+    # One exact estimate per group (the kernel of every value on every point), as the
+    # chart does in the browser
+    densities = []
+    for _, values in df.groupby(["state_code", "decade"])["value"]:
+        distances = (grid[None, :] - values.to_numpy()[:, None]) / bandwidth
+        kernels = np.exp(-0.5 * distances**2) / (bandwidth * np.sqrt(2 * np.pi))
+        densities.append(kernels.mean(axis=0))
+    return np.array(densities)
+
+
+def batched_kde(df, grid, bandwidth):
+    return group_kde(group_codes(df, ["state_code", "decade"]), df["value"], grid, bandwidth)
+
+
+if __name__ == "__main__":
+    df = load_dataset()
+    ngroups = group_codes(df, ["state_code", "decade"]).ngroups
+    print(f"{len(df)} rows, {ngroups} groups (states x decades)")
+    for bandwidth in BANDWIDTHS:
+        for points in GRID_POINTS:
+            grid = density_grid(df["value"], bandwidth, points)
+            expected = loop_kde(df, grid, bandwidth)
+            result = batched_kde(df, grid, bandwidth)
+            # The error of the linear binning, relative to the highest density
+            error = np.abs(result - expected).max() / expected.max()
+
+            loop_seconds = best_of(REPEAT, loop_kde, df, grid, bandwidth)
+            batched_seconds = best_of(REPEAT, batched_kde, df, grid, bandwidth)
+            print(
+                f"bandwidth {bandwidth:3.1f} | {points:4} points | "
+                f"loop {loop_seconds * 1000:8.2f} ms ({ngroups / loop_seconds:9.0f} groups/s) -> "
+                f"batched {batched_seconds * 1000:7.2f} ms ({ngroups / batched_seconds:9.0f} groups/s) "
+                f"({loop_seconds / batched_seconds:5.1f}x) | max relative error {error:.1e}"
+            )
@@ -0,0 +1,133 @@
+import csv
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from Preprocess_data import parse_climdiv, process_to_csv
+
+# Benchmark of the vectorized climdiv parser against the line by line loop
+##########################################################################
+
+CURRENT_DIRPATH = os.path.dirname(os.path.abspath(__file__))
+ORIGINAL_DATASETS_FOLDER = os.path.join(CURRENT_DIRPATH, "original-datasets")
+CLIMDIV_FILES = [
+    "climdiv-tmaxst-v1.0.0-20241205.txt",
+    "climdiv-tminst-v1.0.0-20241205.txt",
+    "climdiv-tmpcst-v1.0.0-20241205.txt",
+]
+REPLICAS = 100
+REPEAT = 3
+
+
+def line_loop_process_to_csv(input_file, output_file):
+    # The previous implementation of `process_to_csv`, kept as a reference
+    with open(input_file, "r") as infile, open(output_file, "w", newline="") as outfile:
+        writer = csv.writer(outfile)
+        writer.writerow(["state_code", "division_number", "element_code", "year", "month", "value"])
+
+        for line in infile:
+            state_code = line[0:3].strip()
+            division_number = line[3:4].strip()
+            element_code = line[4:6].strip()
+            year = int(line[6:10].strip())
+            values = line[10:].strip().split()
+
+            if len(values) != 12:
+                raise ValueError(f"La riga non contiene esattamente 12 valori: {line}")
+
+            for month_index, value in enumerate(values, start=1):
+                writer.writerow([
+                    state_code,
+                    division_number,
+                    element_code,
+                    year,
+                    month_index,
+                    float(value) if value != "-99.90" else None,
+                ])
+
+
+def line_loop_parse(input_file):
+    # Parse only, same per line work of the loop above without writing
+    rows = []
+    with open(input_file, "r") as infile:
+        for line in infile:
+            values = line[10:].strip().split()
+            if len(values) != 12:
+                raise ValueError(f"La riga non contiene esattamente 12 valori: {line}")
+            rows.append((
+                int(line[0:3]),
+                int(line[3:4]),
+                int(line[4:6]),
+                int(line[6:10]),
+                [float(value) if value != "-99.90" else None for value in values],
+            ))
+    return rows
+
+
+def best_of(repeat, function, *args) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def check_same_output(input_file, tmp_dir):
+    # The two implementations must produce the same file and the same values
+    loop_csv = os.path.join(tmp_dir, "loop.csv")
+    vectorized_csv = os.path.join(tmp_dir, "vectorized.csv")
+    line_loop_process_to_csv(input_file, loop_csv)
+    process_to_csv(input_file, vectorized_csv)
+    with open(loop_csv, "rb") as loop, open(vectorized_csv, "rb") as vectorized:
+        assert loop.read() == vectorized.read(), f"Different csv output for {input_file}"
+
+    rows = line_loop_parse(input_file)
+    parsed = parse_climdiv(input_file)
+    expected = np.array([row[4] for row in rows], dtype=np.float64)
+    assert np.array_equal(parsed["value"], expected, equal_nan=True)
+    assert np.array_equal(parsed["year"], [row[3] for row in rows])
+    assert np.array_equal(parsed["state_code"], [row[0] for row in rows])
+
+
+def replicate(input_file, output_file, replicas):
+    with open(input_file, "rb") as infile:
+        content = infile.read()
+    with open(output_file, "wb") as outfile:
+        for _ in range(replicas):
+            outfile.write(content)
+
+
+def benchmark(input_file, tmp_dir, label, repeat=REPEAT):
+    output_file = os.path.join(tmp_dir, "out.csv")
+    size_mb = os.path.getsize(input_file) / 1e6
+
+    loop_parse = best_of(repeat, line_loop_parse, input_file)
+    vectorized_parse = best_of(repeat, parse_climdiv, input_file)
+    loop_csv = best_of(repeat, line_loop_process_to_csv, input_file, output_file)
+    vectorized_csv = best_of(repeat, process_to_csv, input_file, output_file)
+
+    print(
+        f"{label:<45} {size_mb:8.1f} MB | "
+        f"parse {loop_parse:8.3f}s -> {vectorized_parse:7.3f}s ({loop_parse / vectorized_parse:5.1f}x) | "
+        f"csv {loop_csv:8.3f}s -> {vectorized_csv:7.3f}s ({loop_csv / vectorized_csv:5.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        for climdiv_file in CLIMDIV_FILES:
+            input_file = os.path.join(ORIGINAL_DATASETS_FOLDER, climdiv_file)
+            check_same_output(input_file, tmp_dir)
+            benchmark(input_file, tmp_dir, climdiv_file)
+
+            replicated_file = os.path.join(tmp_dir, f"x{REPLICAS}-{climdiv_file}")
+            replicate(input_file, replicated_file, REPLICAS)
+            benchmark(replicated_file, tmp_dir, f"{climdiv_file} x{REPLICAS}", repeat=1)
+            os.remove(replicated_file)
+    finally:
+        shutil.rmtree(tmp_dir)
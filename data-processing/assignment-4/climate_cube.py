@@ -0,0 +1,188 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_processing.rollup import Rollup
+
+# Persistent element x state_code x year x month cube of the climdiv temperatures
+##################################################################################
+
+MONTHS = 12
+
+
+class ClimateCube:
+    """
+    Dense cube of monthly values stored as a `.npy` file and opened as a memmap.
+
+    The axes are element (e.g. "max", "min", "avg"), state code, year and month.
+    The state code axis is indexed directly by the climdiv code (0 to the highest
+    code in the files) and the month axis by `month - 1`, so every selection is a
+    plain slice of the array. Cells without a value are NaN.
+
+    A JSON sidecar next to the `.npy` file keeps the element names, the climdiv
+    element codes and the first year of the year axis.
+    """
+
+    def __init__(self, data: np.ndarray, elements: list, element_codes: list, first_year: int):
+        self.data = data
+        self.elements = list(elements)
+        self.element_codes = list(element_codes)
+        self.first_year = int(first_year)
+
+    @staticmethod
+    def _metadata_path(path: str) -> str:
+        return os.path.splitext(path)[0] + ".json"
+
+    @classmethod
+    def create(cls, path: str, parsed_elements: dict) -> "ClimateCube":
+        """
+        Build the cube on disk from climdiv files already parsed with `parse_climdiv`.
+
+        :param path: The path of the `.npy` file to create.
+        :param parsed_elements: A dict that maps the element name to the dict returned
+            by `parse_climdiv` for that element file.
+        :return: The cube, opened in read mode.
+        """
+
+        for element, parsed in parsed_elements.items():
+            if (parsed["division_number"] != 0).any():
+                raise ValueError(f"The cube only holds statewide files (division 0): `{element}`")
+
+        first_year = min(int(parsed["year"].min()) for parsed in parsed_elements.values())
+        last_year = max(int(parsed["year"].max()) for parsed in parsed_elements.values())
+        max_code = max(int(parsed["state_code"].max()) for parsed in parsed_elements.values())
+        shape = (len(parsed_elements), max_code + 1, last_year - first_year + 1, MONTHS)
+
+        data = np.lib.format.open_memmap(path, mode="w+", dtype=np.float64, shape=shape)
+        data[:] = np.nan
+
+        element_codes = []
+        for element_index, parsed in enumerate(parsed_elements.values()):
+            codes = np.unique(parsed["element_code"])
+            if codes.size != 1:
+                raise ValueError("Every element file must contain a single element code")
+            element_codes.append(int(codes[0]))
+
+            # One assignment per element: every record is a (state, year) row of 12 months
+            data[element_index, parsed["state_code"], parsed["year"] - first_year] = parsed["value"]
+
+        data.flush()
+        del data
+
+        with open(cls._metadata_path(path), "w") as metadata_file:
+            json.dump(
+                {
+                    "elements": list(parsed_elements.keys()),
+                    "element_codes": element_codes,
+                    "first_year": first_year,
+                },
+                metadata_file,
+            )
+
+        return cls.open(path)
+
+    @classmethod
+    def open(cls, path: str, mode: str = "r") -> "ClimateCube":
+        """
+        Open a cube previously written by `create` without loading it in memory.
+
+        :param path: The path of the `.npy` file.
+        :param mode: The memmap mode, `r` (default) or `r+`.
+        :return: The cube.
+        """
+
+        with open(cls._metadata_path(path), "r") as metadata_file:
+            metadata = json.load(metadata_file)
+
+        data = np.load(path, mmap_mode=mode)
+        return cls(data, metadata["elements"], metadata["element_codes"], metadata["first_year"])
+
+    @property
+    def years(self) -> np.ndarray:
+        return np.arange(self.first_year, self.first_year + self.data.shape[2])
+
+    @property
+    def state_codes(self) -> np.ndarray:
+        """The state codes that have at least one value."""
+        return np.flatnonzero(~np.isnan(self.data).all(axis=(0, 2, 3)))
+
+    def element_index(self, element: str) -> int:
+        try:
+            return self.elements.index(element)
+        except ValueError:
+            raise ValueError(f"Unknown element `{element}`, expected one of {self.elements}")
+
+    def year_index(self, year: int) -> int:
+        index = year - self.first_year
+        if not 0 <= index < self.data.shape[2]:
+            raise ValueError(f"Year {year} is out of the cube range")
+        return index
+
+    def element(self, element: str) -> np.ndarray:
+        """The state_code x year x month block of one element."""
+        return self.data[self.element_index(element)]
+
+    def monthly(self, element: str, state_code: int, month: int) -> np.ndarray:
+        """
+        The values of a month for every year, e.g. all the July values of state 4
+        are `cube.monthly("avg", 4, 7)`.
+        """
+        return self.data[self.element_index(element), state_code, :, month - 1]
+
+    def years_range(self, element: str, start_year: int, end_year: int) -> np.ndarray:
+        """The state_code x year x month block for the years in [start_year, end_year]."""
+        start = self.year_index(start_year)
+        end = self.year_index(end_year) + 1
+        return self.data[self.element_index(element), :, start:end]
+
+    def annual_mean(self, element: str, start_year: int, end_year: int) -> np.ndarray:
+        """
+        The annual mean (mean of the 12 months) for every state code and every year
+        in [start_year, end_year], shape (state codes, years). Years with a missing
+        month are NaN.
+        """
+        return self.years_range(element, start_year, end_year).mean(axis=2)
+
+    def to_dataframe(self, element: str) -> pd.DataFrame:
+        """
+        The long format (one row per state, year and month) of an element, without
+        the missing values. The rows are ordered by state code, year and month like
+        the climdiv files.
+        """
+        block = self.element(element)
+        state_code, year, month = np.nonzero(~np.isnan(block))
+
+        return pd.DataFrame({
+            "state_code": state_code,
+            "year": year + self.first_year,
+            "month": month + 1,
+            "value": block[state_code, year, month],
+        })
+
+    def to_wide_dataframe(self) -> pd.DataFrame:
+        """
+        The long format of all the elements at once, one row per state, year and
+        month with a value column for each element (named as the element). Rows
+        where every element is missing are excluded.
+        """
+        block = np.moveaxis(self.data, 0, -1)
+        state_code, year, month = np.nonzero(~np.isnan(block).all(axis=-1))
+        values = block[state_code, year, month]
+
+        return pd.DataFrame({
+            "state_code": state_code,
+            "year": year + self.first_year,
+            "month": month + 1,
+            **{element: values[:, index] for index, element in enumerate(self.elements)},
+        })
+
+    def rollup(self, element: str) -> Rollup:
+        """
+        The roll-up of an element by state code (annual, seasonal, decadal means,
+        normals and anomalies), built directly from the block without the long format.
+        """
+        block = self.element(element)
+        state_codes = pd.DataFrame({"state_code": np.arange(block.shape[0])})
+        return Rollup.from_cube(block, self.first_year, state_codes)
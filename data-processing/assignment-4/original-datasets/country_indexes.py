@@ -123,3 +123,59 @@ x: np.ndarray = np.array(
 
 def get_sorted_countries():
     return sorted(x, key=lambda k: k["index"])
+
+
+# Dense lookup tables indexed directly by the climdiv state code
+################################################################
+
+# Ranges of the state code table (see README_STRUCTURE)
+LAST_STATE_CODE = 50
+FIRST_REGION_CODE = 101
+LAST_REGION_CODE = 109
+NATIONAL_CODE = 110
+
+MAX_CODE = max(country["index"] for country in x)
+
+# code -> name, None for the codes that are not in the table
+NAMES: np.ndarray = np.full(MAX_CODE + 1, None, dtype=object)
+NAMES[[country["index"] for country in x]] = [country["country"] for country in x]
+
+_codes = np.arange(MAX_CODE + 1)
+_known = NAMES != None  # noqa: E711
+
+IS_STATE: np.ndarray = _known & (_codes <= LAST_STATE_CODE)
+IS_REGION: np.ndarray = _known & (_codes >= FIRST_REGION_CODE) & (_codes <= LAST_REGION_CODE)
+IS_NATIONAL: np.ndarray = _codes == NATIONAL_CODE
+
+NAMES.flags.writeable = False
+IS_STATE.flags.writeable = False
+IS_REGION.flags.writeable = False
+IS_NATIONAL.flags.writeable = False
+
+
+def _in_table(codes: np.ndarray) -> np.ndarray:
+    return (codes >= 0) & (codes <= MAX_CODE)
+
+
+def get_names(codes) -> np.ndarray:
+    """
+    Names of the given state codes with a single gather, None for unknown codes.
+
+    :param codes: An array (or Series) of climdiv state codes.
+    :return: An object array with the names.
+    """
+    codes = np.asarray(codes)
+    return np.where(_in_table(codes), np.take(NAMES, codes, mode="clip"), None)
+
+
+def get_mask(codes, table: np.ndarray) -> np.ndarray:
+    """
+    Boolean mask of the given state codes for one of the `IS_*` tables,
+    e.g. `get_mask(df["state_code"], IS_REGION)`.
+
+    :param codes: An array (or Series) of climdiv state codes.
+    :param table: One of `IS_STATE`, `IS_REGION`, `IS_NATIONAL` (or a combination).
+    :return: The boolean mask, False for unknown codes.
+    """
+    codes = np.asarray(codes)
+    return _in_table(codes) & np.take(table, codes, mode="clip")
@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+# The age groups of the Eurostat ICT usage surveys
+SURVEY_AGE_GROUPS = (
+    "Individuals, 16 to 24 years old",
+    "Individuals, 25 to 54 years old",
+    "Individuals, 55 to 74 years old",
+    "Individuals, 75 years old or more",
+)
+
+# The five years age bands of the Eurostat population datasets (from 15 years old), with
+# the index in `SURVEY_AGE_GROUPS` of the group that contains each band. The band from
+# 15 to 19 years is in the group from 16 to 24 years: subtract the population of 15
+# years old first (see `subtract_age_band`)
+POPULATION_AGE_BANDS = (
+    ("From 15 to 19 years", 0),
+    ("From 20 to 24 years", 0),
+    ("From 25 to 29 years", 1),
+    ("From 30 to 34 years", 1),
+    ("From 35 to 39 years", 1),
+    ("From 40 to 44 years", 1),
+    ("From 45 to 49 years", 1),
+    ("From 50 to 54 years", 1),
+    ("From 55 to 59 years", 2),
+    ("From 60 to 64 years", 2),
+    ("From 65 to 69 years", 2),
+    ("From 70 to 74 years", 2),
+    ("75 years or over", 3),
+)
+
+_BANDS = pd.Index([band for band, _ in POPULATION_AGE_BANDS])
+_BAND_TO_GROUP = np.array([group for _, group in POPULATION_AGE_BANDS], dtype=np.intp)
+
+
+def _key_codes(df: DataFrame, keys: list) -> tuple:
+    # One integer code per row for its combination of keys (sorted like the keys) and
+    # the uniques of every key
+    codes = np.zeros(len(df), dtype=np.int64)
+    uniques = []
+    for key in keys:
+        key_codes, key_uniques = pd.factorize(df[key], sort=True)
+        if (key_codes < 0).any():
+            raise ValueError(f"The key column `{key}` has missing values")
+        codes = codes * len(key_uniques) + key_codes
+        uniques.append(key_uniques)
+    return codes, uniques
+
+
+def subtract_age_band(
+    df: DataFrame,
+    df_age: DataFrame,
+    band: str = "From 15 to 19 years",
+    keys: list = ("TIME_PERIOD", "geo"),
+    age: str = "age",
+    value: str = "OBS_VALUE",
+) -> DataFrame:
+    """
+    Subtract the population of a single age (e.g. 15 years old) from the age band that
+    contains it, matching the rows by key (year and country).
+
+    The rows of the band without a match in `df_age` are not changed.
+
+    :param df: The population by age band.
+    :param df_age: The population of the single age, one row per combination of keys.
+    :param band: The age band that contains the age.
+    :param keys: The key columns, in both the dataframes.
+    :param age: The column of the age bands in `df`.
+    :param value: The column of the population, in both the dataframes.
+    :return: A copy of `df` with the corrected band.
+    """
+
+    keys = list(keys)
+    age_index = pd.MultiIndex.from_frame(df_age[keys])
+    if not age_index.is_unique:
+        raise ValueError(f"The population of the age has more than one row for some combination of {keys}")
+
+    rows = np.flatnonzero((df[age] == band).to_numpy())
+    matches = age_index.get_indexer(pd.MultiIndex.from_frame(df[keys].iloc[rows]))
+    found = matches >= 0
+
+    values = df[value].to_numpy(dtype=np.float64, copy=True)
+    values[rows[found]] -= df_age[value].to_numpy(dtype=np.float64)[matches[found]]
+    return df.assign(**{value: values})
+
+
+def to_survey_age_groups(
+    df: DataFrame,
+    keys: list = ("TIME_PERIOD", "geo"),
+    age: str = "age",
+    value: str = "OBS_VALUE",
+) -> DataFrame:
+    """
+    Sum the population of the age bands in the age groups of the surveys (see
+    `POPULATION_AGE_BANDS`), for every combination of keys.
+
+    The bands are mapped to the groups with integer codes and the sums are a single
+    `np.bincount`; the other columns of `df` are not in the result. The missing values
+    count as zero, like `groupby().sum()`.
+
+    :param df: The population by age band.
+    :param keys: The key columns.
+    :param age: The column of the age bands, renamed to the age groups in the result.
+    :param value: The column of the population.
+    :return: The key columns, the age group (categorical, with the categories in
+        `SURVEY_AGE_GROUPS`) and the population, sorted by keys and group.
+    """
+
+    keys = list(keys)
+    band_codes = _BANDS.get_indexer(df[age])
+    if (band_codes < 0).any():
+        unknown = sorted(set(df[age][band_codes < 0].astype(str)))
+        raise ValueError(f"Unknown age bands: {unknown}")
+
+    codes, uniques = _key_codes(df, keys)
+    groups = len(SURVEY_AGE_GROUPS)
+    codes = codes * groups + _BAND_TO_GROUP[band_codes]
+    size = groups
+    for key_uniques in uniques:
+        size *= len(key_uniques)
+
+    values = np.nan_to_num(df[value].to_numpy(dtype=np.float64))
+    sums = np.bincount(codes, weights=values, minlength=size)
+    present = np.flatnonzero(np.bincount(codes, minlength=size))
+
+    # Back from the codes of the present combinations to the keys and the groups
+    columns = {}
+    remainder, group_codes = np.divmod(present, groups)
+    key_codes = []
+    for key_uniques in reversed(uniques):
+        remainder, codes_of_key = np.divmod(remainder, len(key_uniques))
+        key_codes.append(codes_of_key)
+    for key, key_uniques, codes_of_key in zip(keys, uniques, reversed(key_codes)):
+        columns[key] = key_uniques.take(codes_of_key)
+    columns[age] = pd.Categorical.from_codes(group_codes, categories=list(SURVEY_AGE_GROUPS))
+    columns[value] = sums[present]
+    return DataFrame(columns)
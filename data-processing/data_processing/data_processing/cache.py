@@ -0,0 +1,326 @@
+import functools
+import glob
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import threading
+import uuid
+
+import pandas as pd
+from pandas import DataFrame
+
+from data_processing.utils import file_sha256
+
+# The caches are shared by all the pipelines (and all the working directories)
+DEFAULT_CACHE_FOLDER = os.environ.get(
+    "DATA_PROCESSING_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "data_processing")
+)
+DEFAULT_MAX_BYTES = 512 * 2**20
+DEFAULT_STAGE_MAX_BYTES = 256 * 2**20
+PICKLE_PROTOCOL = 5
+
+
+class DiskCache:
+    """
+    A folder of pickles (protocol 5) keyed by hex digests, with least recently used
+    eviction when the folder is larger than `max_bytes`.
+    """
+
+    def __init__(self, folder: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.folder = folder
+        self.max_bytes = max_bytes
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.folder, key + ".pkl")
+
+    def get(self, key: str, default=None):
+        """The cached value or `default`, a hit makes the entry the most recently used."""
+
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, "rb") as entry:
+                value = pickle.load(entry)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return default
+        os.utime(entry_path)
+        return value
+
+    def put(self, key: str, value):
+        """Store a value (atomically, so a concurrent reader never loads half an entry)."""
+
+        os.makedirs(self.folder, exist_ok=True)
+        temporary_path = os.path.join(self.folder, f".{key}.{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            with open(temporary_path, "wb") as entry:
+                pickle.dump(value, entry, protocol=PICKLE_PROTOCOL)
+            os.replace(temporary_path, self._entry_path(key))
+        except BaseException:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            raise
+        self.evict()
+
+    def remove(self, key: str) -> bool:
+        try:
+            os.remove(self._entry_path(key))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits in `max_bytes`."""
+
+        entries = []
+        for name in os.listdir(self.folder):
+            if name.endswith(".pkl"):
+                try:
+                    stat = os.stat(os.path.join(self.folder, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.folder, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        if os.path.isdir(self.folder):
+            for name in os.listdir(self.folder):
+                if name.endswith(".pkl"):
+                    os.remove(os.path.join(self.folder, name))
+
+
+class ParseCache(DiskCache):
+    """
+    On disk cache of parsed csv files.
+
+    An entry is keyed by the sha256 of the content of the source file (hashed again
+    only when the file changes on disk) and by the read options, so two pipelines that
+    read the same file (even from different paths) with the same options share the
+    entry, and an entry is never used after the file changes.
+    """
+
+    def __init__(
+        self,
+        folder: str = os.path.join(DEFAULT_CACHE_FOLDER, "csv"),
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        super().__init__(folder, max_bytes)
+        self._digests = None
+        # The files can be read by several threads at once (see `loader.load_many`)
+        self._digests_lock = threading.Lock()
+
+    def _digests_path(self) -> str:
+        return os.path.join(self.folder, "sources.json")
+
+    def source_digest(self, path: str) -> str:
+        """
+        The sha256 of a source file, hashed again only when its size or modification
+        time change (the digests are kept in `sources.json` in the cache folder).
+
+        :param path: The path of the source file.
+        :return: The hex digest.
+        """
+
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        with self._digests_lock:
+            if self._digests is None:
+                try:
+                    with open(self._digests_path(), "r") as digests_file:
+                        self._digests = json.load(digests_file)
+                except (FileNotFoundError, ValueError):
+                    self._digests = {}
+
+            cached = self._digests.get(path)
+            if cached is not None and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+                return cached[2]
+
+        digest = file_sha256(path)
+        with self._digests_lock:
+            self._digests[path] = [stat.st_size, stat.st_mtime_ns, digest]
+            os.makedirs(self.folder, exist_ok=True)
+            temporary_path = os.path.join(self.folder, f".sources.{uuid.uuid4().hex[:8]}.tmp")
+            with open(temporary_path, "w") as digests_file:
+                json.dump(self._digests, digests_file)
+            os.replace(temporary_path, self._digests_path())
+        return digest
+
+    def key(self, path: str, options: dict):
+        """
+        The key of a parsed file, None if the options can not be part of a key (e.g.
+        they contain functions), in that case the file is not cached.
+
+        :param path: The path of the csv file.
+        :param options: The options for `pd.read_csv`.
+        :return: The hex digest or None.
+        """
+
+        try:
+            identity = json.dumps(
+                {"source": self.source_digest(path), "options": options, "pandas": pd.__version__},
+                sort_keys=True,
+            )
+        except TypeError:
+            return None
+        return hashlib.sha256(identity.encode()).hexdigest()
+
+    def read_csv(self, path: str, **options) -> DataFrame:
+        """
+        `pd.read_csv` through the cache: parse the file only if it is not cached yet.
+
+        :param path: The path of the csv file.
+        :param options: The options for `pd.read_csv`.
+        :return: The dataframe.
+        """
+
+        key = self.key(path, options)
+        if key is not None:
+            df = self.get(key)
+            if df is not None:
+                return df
+
+        df = pd.read_csv(path, **options)
+        if key is not None:
+            self.put(key, df)
+        return df
+
+
+_default_cache = None
+
+
+def cached_read_csv(path: str, **options) -> DataFrame:
+    """
+    `pd.read_csv` through the shared parse cache (see `ParseCache`), a drop in
+    replacement for the loaders of the pipelines.
+
+    :param path: The path of the csv file.
+    :param options: The options for `pd.read_csv`.
+    :return: The dataframe.
+    """
+
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ParseCache()
+    return _default_cache.read_csv(path, **options)
+
+
+@functools.lru_cache(maxsize=None)
+def _package_fingerprint() -> str:
+    # The sha256 of the sources of this package (computed once per process): the
+    # stages call its functions, whose code is not in the source of the stage
+    digest = hashlib.sha256()
+    package_folder = os.path.dirname(os.path.abspath(__file__))
+    for path in sorted(glob.glob(os.path.join(package_folder, "*.py"))):
+        digest.update(f"{os.path.basename(path)}={file_sha256(path)};".encode())
+    return digest.hexdigest()
+
+
+def _update_fingerprint(digest, value):
+    # Frames and series are hashed by content (values, index, columns and dtypes),
+    # every other argument by its pickle
+    if isinstance(value, pd.DataFrame):
+        digest.update(b"DataFrame")
+        digest.update(repr(list(value.columns)).encode())
+        digest.update(repr(value.dtypes.to_dict()).encode())
+        digest.update(repr(value.index.names).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, pd.Series):
+        digest.update(b"Series")
+        digest.update(repr((value.name, value.dtype, value.index.names)).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"{type(value).__name__}{len(value)}".encode())
+        for item in value:
+            _update_fingerprint(digest, item)
+    elif isinstance(value, dict):
+        digest.update(f"dict{len(value)}".encode())
+        for item_key, item in value.items():
+            _update_fingerprint(digest, item_key)
+            _update_fingerprint(digest, item)
+    else:
+        digest.update(pickle.dumps(value, protocol=PICKLE_PROTOCOL))
+
+
+def memoize(func=None, *, folder: str = None, max_bytes: int = DEFAULT_STAGE_MAX_BYTES):
+    """
+    Persist the results of a pipeline stage on disk, e.g.
+
+        @memoize
+        def merge_population_age_group(df: pd.DataFrame) -> pd.DataFrame:
+            ...
+
+    The key is a fingerprint of the source code of the function, of the sources of the
+    `data_processing` package and of its arguments (the frames by content), so a stage
+    is computed again when its code, the package functions it calls or its inputs
+    change. The other global names used by the function (constants, functions of the
+    script) are not part of the key: call `cache_clear()` on the function after
+    changing them.
+
+    Only for functions that do not modify their arguments: on a hit the function is
+    not called at all. Arguments that can not be pickled disable the cache for the call.
+
+    The decorated function has `cache_clear()` (drop all its entries) and
+    `cache_invalidate(*args, **kwargs)` (drop the entry of these arguments).
+
+    :param func: The function.
+    :param folder: The folder of the entries, by default a folder named as the function
+        inside the shared cache folder.
+    :param max_bytes: The size of the folder over which the least recently used entries
+        are removed.
+    :return: The decorated function.
+    """
+
+    if func is None:
+        return functools.partial(memoize, folder=folder, max_bytes=max_bytes)
+
+    module = os.path.splitext(os.path.basename(func.__code__.co_filename))[0]
+    cache = DiskCache(
+        folder or os.path.join(DEFAULT_CACHE_FOLDER, "stages", f"{module}.{func.__qualname__}"),
+        max_bytes,
+    )
+    try:
+        source = inspect.getsource(func)
+    except (OSError, TypeError):
+        source = func.__code__.co_code.hex()
+
+    def cache_key(*args, **kwargs):
+        digest = hashlib.sha256(source.encode())
+        digest.update(_package_fingerprint().encode())
+        try:
+            _update_fingerprint(digest, (args, kwargs))
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return None
+        return digest.hexdigest()
+
+    # Returned by the cache on a miss, a cached None is a hit
+    missing = object()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        key = cache_key(*args, **kwargs)
+        if key is None:
+            return func(*args, **kwargs)
+
+        result = cache.get(key, missing)
+        if result is missing:
+            result = func(*args, **kwargs)
+            cache.put(key, result)
+        return result
+
+    def cache_invalidate(*args, **kwargs) -> bool:
+        key = cache_key(*args, **kwargs)
+        return key is not None and cache.remove(key)
+
+    wrapper.cache_clear = cache.clear
+    wrapper.cache_invalidate = cache_invalidate
+    wrapper.cache = cache
+    return wrapper
@@ -0,0 +1,182 @@
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from data_processing.groups import Groups, group_codes
+
+# Level of detail of the long time series: largest triangle three buckets (LTTB)
+# downsampling of many series at once
+
+
+def _series_bounds(codes: np.ndarray, ngroups: int) -> tuple:
+    # The first position and the length of every series in the rows sorted by series
+    lengths = np.bincount(codes, minlength=ngroups)
+    return np.cumsum(lengths) - lengths, lengths
+
+
+def _first_extrema(values: np.ndarray, codes: np.ndarray, ngroups: int) -> np.ndarray:
+    # The position of the first minimum and of the first maximum of every series
+    # (sorted by series), shape (2, series); -1 for the empty series
+    starts, lengths = _series_bounds(codes, ngroups)
+    result = np.full((2, ngroups), -1, dtype=np.int64)
+    present = np.flatnonzero(lengths)
+    for index, extremum in enumerate((np.minimum, np.maximum)):
+        extreme_values = np.full(ngroups, np.nan)
+        extreme_values[present] = extremum.reduceat(values, starts[present])
+        positions = np.flatnonzero(values == extreme_values[codes])
+        first = np.full(ngroups, len(values), dtype=np.int64)
+        np.minimum.at(first, codes[positions], positions)
+        result[index, present] = first[present]
+    return result
+
+
+def _bucket_of(positions: np.ndarray, every: np.ndarray, threshold: int) -> np.ndarray:
+    # The bucket of the interior points at the given positions of their series, the
+    # bucket b holds the positions from floor(b * every) + 1 to floor((b + 1) * every)
+    buckets = np.clip(np.floor((positions - 1) / every).astype(np.int64), 0, threshold - 3)
+    # Corrected for the rounding of the division
+    buckets -= positions < np.floor(buckets * every) + 1
+    buckets += positions >= np.floor((buckets + 1) * every) + 1
+    return np.clip(buckets, 0, threshold - 3)
+
+
+def lttb_mask(groups: Groups, x, y, threshold: int, keep_extrema: bool = True) -> np.ndarray:
+    """
+    The row mask of the points kept by the largest triangle three buckets algorithm in
+    every series (e.g. the monthly temperatures of every state), `threshold` points per
+    series: the first and the last point and, for every bucket of the points between
+    them, the point of the largest triangle with the point kept in the previous bucket
+    and the mean of the next bucket.
+
+    The buckets are visited in order, as the algorithm requires, but every step selects
+    the point of the current bucket of all the series at once, so the number of NumPy
+    operations depends on the threshold and not on the number of series.
+
+    The series with at most `threshold` points are kept whole. With `keep_extrema` the
+    minimum and the maximum of every series are always kept, in place of the point
+    selected in their bucket (so a series has one more point when both are in the same
+    bucket).
+
+    :param groups: The series.
+    :param x: The positions of the points (e.g. the time), one for every row.
+    :param y: The values, one for every row.
+    :param threshold: The number of points kept in every series, at least 3.
+    :param keep_extrema: Keep the minimum and the maximum of every series.
+    :return: One boolean for every row, False for the rows in no series or with a
+        missing position or value.
+    """
+
+    if threshold < 3:
+        raise ValueError("The threshold must be at least 3")
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    valid = (groups.codes >= 0) & ~np.isnan(x) & ~np.isnan(y)
+    rows = np.flatnonzero(valid)
+    # The rows by series and position, every series is a contiguous slice
+    rows = rows[np.lexsort((x[rows], groups.codes[rows]))]
+    codes = groups.codes[rows]
+    xs, ys = x[rows], y[rows]
+
+    starts, lengths = _series_bounds(codes, groups.ngroups)
+    keep = np.zeros(len(rows), dtype=bool)
+    short = lengths <= threshold
+    keep[short[codes]] = True
+
+    series = np.flatnonzero(~short)
+    if len(series):
+        starts, lengths = starts[series], lengths[series]
+        # Every series has threshold - 2 buckets between the first and the last point
+        every = (lengths - 2) / (threshold - 2)
+        width = int(np.ceil(every.max())) + 1
+        offsets = np.arange(width)
+        # Cumulative sums of the points, for the means of the next buckets
+        x_sums = np.concatenate([[0.0], np.cumsum(xs)])
+        y_sums = np.concatenate([[0.0], np.cumsum(ys)])
+
+        selected = np.empty((len(series), threshold), dtype=np.int64)
+        selected[:, 0] = starts
+        selected[:, -1] = starts + lengths - 1
+        previous = starts
+        for bucket in range(threshold - 2):
+            low = starts + np.floor(bucket * every).astype(np.int64) + 1
+            high = starts + np.floor((bucket + 1) * every).astype(np.int64) + 1
+            next_high = np.minimum(starts + np.floor((bucket + 2) * every).astype(np.int64) + 1, starts + lengths)
+            next_count = next_high - high
+            mean_x = (x_sums[next_high] - x_sums[high]) / next_count
+            mean_y = (y_sums[next_high] - y_sums[high]) / next_count
+
+            # The candidates of the bucket of every series, padded to the widest bucket
+            candidates = low[:, None] + offsets[None, :]
+            inside = candidates < high[:, None]
+            candidates = np.minimum(candidates, (high - 1)[:, None])
+            ax, ay = xs[previous][:, None], ys[previous][:, None]
+            areas = np.abs(
+                (ax - mean_x[:, None]) * (ys[candidates] - ay) - (ax - xs[candidates]) * (mean_y[:, None] - ay)
+            )
+            areas[~inside] = -1.0
+            previous = candidates[np.arange(len(series)), np.argmax(areas, axis=1)]
+            selected[:, bucket + 1] = previous
+
+        keep[selected.ravel()] = True
+
+        if keep_extrema:
+            extrema = _first_extrema(ys, codes, groups.ngroups)[:, series]
+            rows_of = np.arange(len(series))
+            replaced = []
+            for first in extrema:
+                interior = (first > starts) & (first < starts + lengths - 1) & ~keep[first]
+                buckets = _bucket_of(first - starts, every, threshold)
+                replaced.append(selected[rows_of, buckets + 1][interior])
+            # The extrema are set after the points they replace are removed, so an
+            # extremum selected in the bucket of the other one is kept
+            keep[np.concatenate(replaced)] = False
+            keep[extrema.ravel()] = True
+
+    mask = np.zeros(len(x), dtype=bool)
+    mask[rows[keep]] = True
+    return mask
+
+
+def downsample_levels(
+    df: DataFrame,
+    by: list,
+    time: str,
+    value: str,
+    levels: list = (200, 800, None),
+    keep_extrema: bool = True,
+) -> DataFrame:
+    """
+    The levels of detail of the series of a frame (one row per entity and time), e.g.
+    200 and 800 points per series and the full series, for the charts that load the
+    coarse level first:
+
+        df = downsample_levels(df, ["country"], "year", "value", levels=[200, 800])
+
+    The series are factorized once and shared by all the levels, see `lttb_mask`.
+
+    :param df: The frame.
+    :param by: The columns of the series (e.g. the entity).
+    :param time: The column of the positions of the points, numeric or datetime.
+    :param value: The column of the values.
+    :param levels: The number of points of every level, None for the full series.
+    :param keep_extrema: Keep the minimum and the maximum of every series.
+    :return: The rows of every level, in the order of `df`, with a `level` column
+        (the number of points, or "full").
+    """
+
+    groups = group_codes(df, by)
+    x = df[time]
+    if pd.api.types.is_datetime64_any_dtype(x):
+        x = x.astype("int64")
+    x = x.to_numpy(dtype=np.float64)
+    y = df[value].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    frames = []
+    for level in levels:
+        if level is None:
+            frames.append(df.assign(level="full"))
+        else:
+            mask = lttb_mask(groups, x, y, level, keep_extrema)
+            frames.append(df[mask].assign(level=str(level)))
+    return pd.concat(frames, ignore_index=True)
@@ -1,35 +1,9 @@
 from pandas import DataFrame
 
-EU_COUNTRIES = [
-    "Austria",
-    "Belgium",
-    "Bulgaria",
-    "Croatia",
-    "Cyprus",
-    "Czech Republic",
-    "Denmark",
-    "Estonia",
-    "Finland",
-    "France",
-    "Germany",
-    "Greece",
-    "Hungary",
-    "Ireland",
-    "Italy",
-    "Latvia",
-    "Lithuania",
-    "Luxembourg",
-    "Malta",
-    "Netherlands",
-    "Poland",
-    "Portugal",
-    "Romania",
-    "Slovakia",
-    "Slovenia",
-    "Spain",
-    "Sweden",
-    "United Kingdom",
-]
+from data_processing import geo
+
+# The EU members, United Kingdom included
+EU_COUNTRIES = geo.get_names(geo.EU28)
 
 
 def remove_non_eu_countires(dataframe: DataFrame, geo_column_name: str) -> DataFrame:
@@ -42,7 +16,7 @@ def remove_non_eu_countires(dataframe: DataFrame, geo_column_name: str) -> DataF
     :return: The dataframe filtered without the non eu countries.
     """
 
-    mask = dataframe[geo_column_name].isin(EU_COUNTRIES)
+    mask = geo.is_member(dataframe[geo_column_name], geo.EU28)
     df_filtered = dataframe[mask]
 
     if not isinstance(df_filtered, DataFrame):
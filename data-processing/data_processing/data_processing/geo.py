@@ -0,0 +1,169 @@
+from functools import lru_cache
+from typing import Iterable, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+
+class GeoEntity(NamedTuple):
+    code: int
+    name: str
+    short_name: str
+    eurostat_code: str
+    aliases: tuple = ()
+
+
+# Code given to every label that is not in the registry
+UNKNOWN_CODE = 0
+
+# The codes are stable: never renumber an entry, only append new ones
+COUNTRIES = (
+    GeoEntity(1, "Austria", "Austria", "AT"),
+    GeoEntity(2, "Belgium", "Belgium", "BE"),
+    GeoEntity(3, "Bulgaria", "Bulgaria", "BG"),
+    GeoEntity(4, "Croatia", "Croatia", "HR"),
+    GeoEntity(5, "Cyprus", "Cyprus", "CY"),
+    GeoEntity(6, "Czech Republic", "Czech Republic", "CZ"),
+    GeoEntity(7, "Denmark", "Denmark", "DK"),
+    GeoEntity(8, "Estonia", "Estonia", "EE"),
+    GeoEntity(9, "Finland", "Finland", "FI"),
+    GeoEntity(10, "France", "France", "FR"),
+    GeoEntity(11, "Germany", "Germany", "DE"),
+    GeoEntity(12, "Greece", "Greece", "EL"),
+    GeoEntity(13, "Hungary", "Hungary", "HU"),
+    GeoEntity(14, "Ireland", "Ireland", "IE"),
+    GeoEntity(15, "Italy", "Italy", "IT"),
+    GeoEntity(16, "Latvia", "Latvia", "LV"),
+    GeoEntity(17, "Lithuania", "Lithuania", "LT"),
+    GeoEntity(18, "Luxembourg", "Luxembourg", "LU"),
+    GeoEntity(19, "Malta", "Malta", "MT"),
+    GeoEntity(20, "Netherlands", "Netherlands", "NL"),
+    GeoEntity(21, "Poland", "Poland", "PL"),
+    GeoEntity(22, "Portugal", "Portugal", "PT"),
+    GeoEntity(23, "Romania", "Romania", "RO"),
+    GeoEntity(24, "Slovakia", "Slovakia", "SK"),
+    GeoEntity(25, "Slovenia", "Slovenia", "SI"),
+    GeoEntity(26, "Spain", "Spain", "ES"),
+    GeoEntity(27, "Sweden", "Sweden", "SE"),
+    GeoEntity(28, "United Kingdom", "United Kingdom", "UK"),
+)
+
+AGGREGATES = (
+    GeoEntity(
+        100,
+        "European Union - 27 countries (from 2020)",
+        "EU-27(from 2020)",
+        "EU27_2020",
+        ("European Union (27)",),
+    ),
+    GeoEntity(
+        101,
+        "European Union - 28 countries (2013-2020)",
+        "EU-28(2013-2020)",
+        "EU28",
+        ("European Union (28)",),
+    ),
+)
+
+ENTITIES = COUNTRIES + AGGREGATES
+
+# Membership sets (sets of codes)
+UNITED_KINGDOM = 28
+EU28 = frozenset(country.code for country in COUNTRIES)
+EU27 = EU28 - {UNITED_KINGDOM}
+EU_AGGREGATES = frozenset(aggregate.code for aggregate in AGGREGATES)
+
+# Every accepted label (name, aliases and eurostat code) -> code
+_CODE_BY_LABEL = {
+    label: entity.code
+    for entity in ENTITIES
+    for label in (entity.name, entity.eurostat_code, *entity.aliases)
+}
+
+MAX_CODE = max(entity.code for entity in ENTITIES)
+
+# code -> name and code -> short name, None for the unknown codes
+NAMES = np.full(MAX_CODE + 1, None, dtype=object)
+NAMES[[entity.code for entity in ENTITIES]] = [entity.name for entity in ENTITIES]
+SHORT_NAMES = np.full(MAX_CODE + 1, None, dtype=object)
+SHORT_NAMES[[entity.code for entity in ENTITIES]] = [entity.short_name for entity in ENTITIES]
+
+
+def get_names(members: Iterable[int]) -> list:
+    """
+    Names of the given codes, sorted by code.
+
+    :param members: The codes, e.g. one of the membership sets.
+    :return: The list of names.
+    """
+
+    return [NAMES[code] for code in sorted(members)]
+
+
+def encode(values) -> np.ndarray:
+    """
+    Convert a column of labels (names, aliases or eurostat codes) into registry codes.
+
+    The labels are factorized first, so the dictionary lookup is done once per distinct
+    label and the result is broadcasted back with a single gather.
+
+    :param values: The labels, a Series (plain or categorical) or an array.
+    :return: An int16 array with the codes, `UNKNOWN_CODE` for the labels not in the registry.
+    """
+
+    positions, uniques = pd.factorize(values)
+    lookup = np.array(
+        [_CODE_BY_LABEL.get(label, UNKNOWN_CODE) for label in uniques] + [UNKNOWN_CODE],
+        dtype=np.int16,
+    )
+    # The missing values have position -1, that is the trailing UNKNOWN_CODE
+    return lookup[positions]
+
+
+@lru_cache(maxsize=None)
+def membership_table(members: frozenset) -> np.ndarray:
+    """
+    Boolean table indexed by code that is True for the codes in `members`.
+
+    :param members: The membership set.
+    :return: The read only table.
+    """
+
+    table = np.zeros(MAX_CODE + 1, dtype=bool)
+    table[list(members)] = True
+    table.flags.writeable = False
+    return table
+
+
+def is_member(values, members: frozenset) -> np.ndarray:
+    """
+    Boolean mask of the labels that belong to a membership set, e.g.
+    `df[is_member(df["geo"], EU28 | EU_AGGREGATES)]`.
+
+    :param values: The labels, a Series (plain or categorical) or an array.
+    :param members: The membership set.
+    :return: The boolean mask.
+    """
+
+    return membership_table(frozenset(members))[encode(values)]
+
+
+def to_short_names(values: pd.Series) -> pd.Series:
+    """
+    Replace the labels of the registry with their short display name, the labels
+    that are not in the registry are kept as they are.
+
+    :param values: The column of labels.
+    :return: The renamed column, with the same index.
+    """
+
+    positions, uniques = pd.factorize(values)
+    renamed = np.array(
+        [
+            SHORT_NAMES[_CODE_BY_LABEL[label]] if label in _CODE_BY_LABEL else label
+            for label in uniques
+        ]
+        + [np.nan],
+        dtype=object,
+    )
+    return pd.Series(renamed[positions], index=values.index, name=values.name)
@@ -0,0 +1,355 @@
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+from pandas.api.extensions import take
+
+
+class Groups(NamedTuple):
+    """
+    The groups of the rows of a frame, as integer codes: the building block of the
+    group operators of this module, computed once and shared by all of them.
+    """
+
+    # The group of every row, -1 for the rows with a missing key (in no group)
+    codes: np.ndarray
+    # The number of groups, numbered from 0 in the order of the keys
+    ngroups: int
+    # The key columns and the labels of every group (one array for every key column)
+    keys: tuple
+    labels: tuple
+
+
+# Up to this number of codes per row the codes are compacted with a dense table
+# instead of a hash table
+_DENSE_CODES_PER_ROW = 4
+
+
+def _compact(codes: np.ndarray, size: int) -> tuple:
+    # The distinct codes (sorted) and the position of every code among them
+    if size <= _DENSE_CODES_PER_ROW * max(len(codes), 1):
+        present = np.bincount(codes, minlength=size) > 0
+        positions = np.cumsum(present) - 1
+        return np.flatnonzero(present), positions[codes]
+    compacted, distinct = pd.factorize(codes, sort=True)
+    return distinct, compacted
+
+
+def _factorize(values) -> tuple:
+    # Like `pd.factorize(values, sort=True)`, without hashing the categoricals (their
+    # codes are used as they are) and the integers in a small range (offset from the minimum)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy().astype(np.intp), values.cat.categories
+    array = values.to_numpy() if isinstance(values, pd.Series) else np.asarray(values)
+    if array.dtype.kind in "iu" and len(array):
+        low, high = array.min(), array.max()
+        if int(high) - int(low) < _DENSE_CODES_PER_ROW * len(array):
+            # The offsets in int64, the range of a small dtype (e.g. int8) does not fit
+            # in it; the distinct values are rebuilt in the dtype, modulo its range
+            offsets = (array.astype(np.int64) - np.asarray(low).astype(np.int64)).astype(np.intp)
+            distinct, codes = _compact(offsets, int(high) - int(low) + 1)
+            return codes, pd.Index(distinct.astype(array.dtype) + low)
+    return pd.factorize(values, sort=True)
+
+
+def group_codes(df: DataFrame, keys: list) -> Groups:
+    """
+    Factorize the key columns of a frame into one group code per row.
+
+    The groups are the combinations of keys in the frame (like `groupby` with
+    `observed=True`), sorted by the keys; the rows with a missing key are in no group
+    (like `groupby` with `dropna=True`).
+
+    :param df: The frame.
+    :param keys: The key columns.
+    :return: The groups.
+    """
+
+    keys = tuple(keys)
+    if not keys:
+        raise ValueError("At least one key column is required")
+
+    combined = np.zeros(len(df), dtype=np.int64)
+    missing = np.zeros(len(df), dtype=bool)
+    uniques = []
+    size = 1
+    for key in keys:
+        key_codes, key_uniques = _factorize(df[key])
+        missing |= key_codes < 0
+        combined = combined * len(key_uniques) + key_codes
+        uniques.append(key_uniques)
+        size *= max(len(key_uniques), 1)
+
+    # The combined codes are in the order of the keys, so are the compacted ones
+    groups, compacted = _compact(combined[~missing], size)
+    codes = np.full(len(df), -1, dtype=np.intp)
+    codes[~missing] = compacted
+    ngroups = len(groups)
+
+    labels = []
+    for key_uniques in reversed(uniques):
+        groups, key_codes = np.divmod(groups, len(key_uniques))
+        labels.append(key_uniques.take(key_codes))
+    return Groups(codes, ngroups, keys, tuple(reversed(labels)))
+
+
+def group_labels(groups: Groups) -> DataFrame:
+    """The key columns with the labels of every group, one row per group."""
+
+    return DataFrame(dict(zip(groups.keys, groups.labels)))
+
+
+def group_size(groups: Groups) -> np.ndarray:
+    """The number of rows of every group."""
+
+    return np.bincount(groups.codes[groups.codes >= 0], minlength=groups.ngroups)
+
+
+def group_nunique(groups: Groups, values) -> np.ndarray:
+    """
+    The number of distinct values of every group, missing values excluded (like
+    `groupby().nunique()`).
+
+    :param groups: The groups.
+    :param values: The values, one for every row.
+    :return: The counts, one for every group.
+    """
+
+    value_codes, value_uniques = _factorize(values)
+    nvalues = max(len(value_uniques), 1)
+    valid = (groups.codes >= 0) & (value_codes >= 0)
+    pairs = groups.codes[valid].astype(np.int64) * nvalues + value_codes[valid]
+    distinct_pairs, _ = _compact(pairs, groups.ngroups * nvalues)
+    return np.bincount(distinct_pairs // nvalues, minlength=groups.ngroups)
+
+
+def _valid_values(groups: Groups, values) -> tuple:
+    values = np.asarray(values, dtype=np.float64)
+    valid = (groups.codes >= 0) & ~np.isnan(values)
+    return values, valid
+
+
+def group_sum(groups: Groups, values) -> np.ndarray:
+    """The sum of the values of every group, missing values excluded (0 if none)."""
+
+    values, valid = _valid_values(groups, values)
+    return np.bincount(groups.codes[valid], weights=values[valid], minlength=groups.ngroups)
+
+
+def group_mean(groups: Groups, values) -> np.ndarray:
+    """The mean of the values of every group, missing values excluded (NaN if none)."""
+
+    values, valid = _valid_values(groups, values)
+    sums = np.bincount(groups.codes[valid], weights=values[valid], minlength=groups.ngroups)
+    counts = np.bincount(groups.codes[valid], minlength=groups.ngroups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+
+def group_quantiles(groups: Groups, values, quantiles) -> np.ndarray:
+    """
+    The quantiles of the values of every group, missing values excluded, with the
+    linear interpolation of `np.quantile` (and `d3.quantile`). All the groups are
+    sorted at once, with a single sort of the rows by group and value.
+
+    :param groups: The groups.
+    :param values: The values, one for every row.
+    :param quantiles: The quantiles, between 0 and 1 (e.g. [0.25, 0.5, 0.75]).
+    :return: The quantiles, shape (groups, quantiles), NaN for the groups without values.
+    """
+
+    values, valid = _valid_values(groups, values)
+    quantiles = np.asarray(quantiles, dtype=np.float64)
+    rows = np.flatnonzero(valid)
+    if not len(rows):
+        return np.full((groups.ngroups, len(quantiles)), np.nan)
+    ordered = values[rows[np.lexsort((values[rows], groups.codes[rows]))]]
+
+    counts = np.bincount(groups.codes[rows], minlength=groups.ngroups)
+    starts = np.cumsum(counts) - counts
+    positions = starts[:, None] + quantiles[None, :] * np.maximum(counts - 1, 0)[:, None]
+    # The positions of the groups without values are clipped, then set to NaN
+    low = np.clip(np.floor(positions).astype(np.intp), 0, len(ordered) - 1)
+    high = np.clip(np.minimum(low + 1, (starts + counts - 1)[:, None]), 0, len(ordered) - 1)
+    fractions = positions - np.floor(positions)
+    result = ordered[low] + (ordered[high] - ordered[low]) * fractions
+    result[counts == 0] = np.nan
+    return result
+
+
+def _first_rows(groups: Groups, values, last: bool) -> np.ndarray:
+    # The row of the first (or last) non missing value of every group, -1 if none
+    valid = (groups.codes >= 0) & ~pd.isna(values)
+    rows = np.flatnonzero(valid)
+    if last:
+        result = np.full(groups.ngroups, -1, dtype=np.intp)
+        np.maximum.at(result, groups.codes[rows], rows)
+    else:
+        result = np.full(groups.ngroups, len(groups.codes), dtype=np.intp)
+        np.minimum.at(result, groups.codes[rows], rows)
+        result[result == len(groups.codes)] = -1
+    return result
+
+
+def group_first(groups: Groups, values) -> pd.Series:
+    """
+    The first non missing value of every group (like `groupby().first()`).
+
+    :param groups: The groups.
+    :param values: The values, one for every row.
+    :return: The values (missing for the groups without values), one for every group.
+    """
+
+    rows = _first_rows(groups, values, last=False)
+    return pd.Series(take(pd.array(values), rows, allow_fill=True), name=getattr(values, "name", None))
+
+
+def group_last(groups: Groups, values) -> pd.Series:
+    """The last non missing value of every group (like `groupby().last()`), see `group_first`."""
+
+    rows = _first_rows(groups, values, last=True)
+    return pd.Series(take(pd.array(values), rows, allow_fill=True), name=getattr(values, "name", None))
+
+
+def broadcast(groups: Groups, group_values) -> np.ndarray:
+    """
+    The value of its group for every row (like `groupby().transform()`).
+
+    :param groups: The groups.
+    :param group_values: One value for every group.
+    :return: One value for every row, NaN for the rows in no group.
+    """
+
+    group_values = np.asarray(group_values, dtype=np.float64)
+    return np.where(groups.codes >= 0, group_values[np.maximum(groups.codes, 0)], np.nan)
+
+
+def group_mask(groups: Groups, selected) -> np.ndarray:
+    """
+    The row mask of the selected groups, e.g. the rows of the groups with at least two
+    distinct ages:
+
+        groups = group_codes(df, ["time_period", "geo"])
+        df = df[group_mask(groups, group_nunique(groups, df["age"]) >= 2)]
+
+    :param groups: The groups.
+    :param selected: One boolean for every group.
+    :return: One boolean for every row, False for the rows in no group.
+    """
+
+    selected = np.append(np.asarray(selected, dtype=bool), False)
+    # The rows in no group (-1) get the trailing False
+    return selected[groups.codes]
+
+
+def _top_k_rows(values: np.ndarray, rows: np.ndarray, k: int) -> np.ndarray:
+    # The k rows with the largest values (ties broken by row order), with a partial sort
+    if len(rows) <= k:
+        return rows
+    candidates = values[rows]
+    threshold = candidates[np.argpartition(-candidates, k - 1)[k - 1]]
+    above = rows[candidates > threshold]
+    ties = rows[candidates == threshold][: k - len(above)]
+    return np.sort(np.concatenate([above, ties]))
+
+
+def _top_k_candidates(values: np.ndarray, codes: np.ndarray, rows: np.ndarray, ngroups: int, k: int) -> np.ndarray:
+    # The mask of the rows that can be in the top k of their group, in one pass: the
+    # rows are dealt in k lanes (by row number) and the smallest of the k lane maxima
+    # of a group is reached by at least k of its rows, so the k-th largest value is
+    # not below it (-inf if a lane of the group is empty)
+    lane_maxima = np.full(ngroups * k, -np.inf)
+    np.maximum.at(lane_maxima, codes * k + rows % k, values)
+    bounds = lane_maxima.reshape(ngroups, k).min(axis=1)
+    return values >= bounds[codes]
+
+
+def top_k_mask(values, k: int, groups: Groups = None, largest: bool = True) -> np.ndarray:
+    """
+    The row mask of the k largest (or smallest) values, overall or in every group (e.g.
+    the top emitters of every year):
+
+        groups = group_codes(df, ["year"])
+        df = df[top_k_mask(df["emission"], 5, groups)]
+
+    The missing values are never selected; the ties are broken by row order. Overall
+    the rows are selected with a partial sort (`np.argpartition`). In groups, a first
+    pass discards the rows below a lower bound of the k-th largest value of their
+    group, then the remaining candidates are sorted by group and value (a single
+    stable sort).
+
+    :param values: The values, one for every row.
+    :param k: The number of rows to select (in every group).
+    :param groups: The groups, if None the top k of all the rows.
+    :param largest: Select the largest values, otherwise the smallest.
+    :return: One boolean for every row.
+    """
+
+    values = np.asarray(values, dtype=np.float64)
+    if not largest:
+        values = -values
+    mask = np.zeros(len(values), dtype=bool)
+    if k <= 0:
+        return mask
+
+    valid = ~np.isnan(values)
+    if groups is None:
+        mask[_top_k_rows(values, np.flatnonzero(valid), k)] = True
+        return mask
+
+    valid &= groups.codes >= 0
+    rows = np.flatnonzero(valid)
+    if groups.ngroups * k < len(rows):
+        rows = rows[_top_k_candidates(values[rows], groups.codes[rows], rows, groups.ngroups, k)]
+    # By group, then by decreasing value (stable, so the ties keep the row order)
+    order = rows[np.lexsort((-values[rows], groups.codes[rows]))]
+    ordered_codes = groups.codes[order]
+    starts = np.flatnonzero(np.r_[True, ordered_codes[1:] != ordered_codes[:-1]])
+    ranks = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+    mask[order[ranks < k]] = True
+    return mask
+
+
+def top_k_with_other(
+    df: DataFrame,
+    value: str,
+    k: int,
+    by: list = (),
+    other: dict = None,
+) -> DataFrame:
+    """
+    The rows with the k largest values (overall or in every group) and, for every group
+    with more rows, one "Other" row with the sum of the remaining values, e.g. the top 5
+    emitters of every year and the rest of the countries.
+
+    :param df: The frame.
+    :param value: The column of the values.
+    :param k: The number of rows kept (in every group).
+    :param by: The columns of the groups, if empty the top k of all the rows.
+    :param other: The values of the other columns of the "Other" rows (e.g. the label
+        of the entity), the columns not in `by` or in `other` are missing.
+    :return: The selected rows and the "Other" rows, by group (in the order of the
+        keys) and by decreasing value.
+    """
+
+    by = list(by)
+    if by:
+        groups = group_codes(df, by)
+    else:
+        groups = Groups(np.zeros(len(df), dtype=np.intp), 1, (), ())
+
+    values = df[value].to_numpy(dtype=np.float64)
+    mask = top_k_mask(values, k, groups)
+    rest = ~mask & (groups.codes >= 0) & ~np.isnan(values)
+    other_sums = np.bincount(groups.codes[rest], weights=values[rest], minlength=groups.ngroups)
+    with_other = np.flatnonzero(np.bincount(groups.codes[rest], minlength=groups.ngroups))
+
+    other_columns = {key: labels.take(with_other) for key, labels in zip(groups.keys, groups.labels)}
+    other_columns.update({column: [label] * len(with_other) for column, label in (other or {}).items()})
+    other_columns[value] = other_sums[with_other]
+    result = pd.concat([df[mask], DataFrame(other_columns)], ignore_index=True)
+
+    result_codes = np.concatenate([groups.codes[mask], with_other])
+    order = np.lexsort((-result[value].to_numpy(dtype=np.float64), result_codes))
+    return result.take(order).reset_index(drop=True)
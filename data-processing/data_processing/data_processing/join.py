@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+from pandas.api.extensions import take
+
+# Over this number of key combinations the codes are compacted with `pd.factorize`
+_MAX_DENSE_CODES = 2**40
+
+
+def _panel_codes(frames: list, on: list) -> tuple:
+    # One integer code per row of every frame for its combination of keys, computed
+    # by factorizing each key dimension once over all the frames (the uniques are
+    # sorted, so the order of the codes is the order of the keys)
+    lengths = [len(df) for df in frames]
+    codes = np.zeros(sum(lengths), dtype=np.int64)
+    size = 1
+    for column in on:
+        keys = pd.concat([df[column] for df in frames], ignore_index=True)
+        column_codes, uniques = pd.factorize(keys, sort=True, use_na_sentinel=False)
+        if size * max(len(uniques), 1) > _MAX_DENSE_CODES:
+            codes, compacted = pd.factorize(codes, sort=True)
+            size = len(compacted)
+        codes = codes * len(uniques) + column_codes
+        size *= max(len(uniques), 1)
+
+    if size > len(codes):
+        codes, compacted = pd.factorize(codes, sort=True)
+        size = len(compacted)
+    return np.split(codes, np.cumsum(lengths)[:-1]), size
+
+
+def panel_join(frames: list, on: list, how: str = "inner") -> DataFrame:
+    """
+    Join several frames keyed on the same dimensions (e.g. `country_name` and `year`)
+    in one pass, the same result of chaining `pd.merge(left, right, on=on, how=how)`
+    on the frames without hashing the keys again and without the intermediate frames
+    of every merge.
+
+    The keys are factorized once into an integer code per row, then every value
+    column is gathered directly in the result, so the cost grows linearly with the
+    number of frames.
+
+    Every frame must have at most one row for each combination of keys (a panel) and
+    the value columns (the columns not in `on`) must have different names.
+
+    :param frames: The frames to join.
+    :param on: The key columns, in every frame.
+    :param how: `inner` (the combinations of keys in every frame, in the order of the
+        first frame) or `outer` (the combinations in any frame, sorted by the keys; the
+        values missing in a frame are NaN).
+    :return: The joined frame: the key columns, then the value columns of every frame
+        in order.
+    """
+
+    if how not in ("inner", "outer"):
+        raise ValueError(f"Unsupported join `{how}`, use `inner` or `outer`")
+    if not frames:
+        raise ValueError("At least one frame is required")
+
+    on = list(on)
+    value_columns = []
+    for df in frames:
+        value_columns.extend(column for column in df.columns if column not in on)
+    if len(set(value_columns)) != len(value_columns):
+        raise ValueError("The value columns of the frames must have different names")
+
+    frame_codes, size = _panel_codes(frames, on)
+
+    # positions[i][code] is the row of the frame i with that combination of keys, -1 if none
+    positions = []
+    for df, codes in zip(frames, frame_codes):
+        frame_positions = np.full(size, -1, dtype=np.intp)
+        frame_positions[codes] = np.arange(len(codes))
+        # With a repeated combination only the last row is kept in the positions
+        if (frame_positions[codes] != np.arange(len(codes))).any():
+            raise ValueError(f"The frame has more than one row for some combination of {on}")
+        positions.append(frame_positions)
+
+    if how == "inner":
+        result_codes = frame_codes[0]
+        for frame_positions in positions[1:]:
+            result_codes = result_codes[frame_positions[result_codes] >= 0]
+    else:
+        present = np.zeros(size, dtype=bool)
+        for frame_positions in positions:
+            present |= frame_positions >= 0
+        result_codes = np.flatnonzero(present)
+
+    columns = {}
+    if how == "inner":
+        rows = positions[0][result_codes]
+        for column in on:
+            columns[column] = take(frames[0][column].array, rows)
+    else:
+        # The keys of every combination from the first frame that has it
+        first_rows = np.full(size, -1, dtype=np.intp)
+        offset = 0
+        for df, frame_positions in zip(frames, positions):
+            found = (first_rows < 0) & (frame_positions >= 0)
+            first_rows[found] = frame_positions[found] + offset
+            offset += len(df)
+        rows = first_rows[result_codes]
+        for column in on:
+            keys = pd.concat([df[column] for df in frames], ignore_index=True).array
+            columns[column] = take(keys, rows)
+
+    for df, frame_positions in zip(frames, positions):
+        rows = frame_positions[result_codes]
+        allow_fill = bool((rows < 0).any())
+        for column in df.columns:
+            if column not in on:
+                columns[column] = take(df[column].array, rows, allow_fill=allow_fill)
+
+    return DataFrame(columns)
@@ -0,0 +1,170 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Mapping
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from data_processing import geo
+from data_processing.cache import cached_read_csv
+from data_processing.schema import SCHEMAS, DatasetSchema, schema_name
+
+# Rows parsed at once by the streaming loader
+DEFAULT_CHUNKSIZE = 100_000
+
+# A predicate receives a chunk and returns the boolean mask of the rows to keep
+Predicate = Callable[[DataFrame], np.ndarray]
+
+
+def equals(column: str, value) -> Predicate:
+    return lambda chunk: (chunk[column] == value).to_numpy()
+
+
+def not_equals(column: str, value) -> Predicate:
+    return lambda chunk: (chunk[column] != value).to_numpy()
+
+
+def greater_than(column: str, value) -> Predicate:
+    return lambda chunk: (chunk[column] > value).to_numpy()
+
+
+def is_in(column: str, values: Iterable) -> Predicate:
+    values = list(values)
+    return lambda chunk: chunk[column].isin(values).to_numpy()
+
+
+def is_null(column: str) -> Predicate:
+    return lambda chunk: chunk[column].isna().to_numpy()
+
+
+def member_of(column: str, members: frozenset) -> Predicate:
+    """Rows whose label in `column` belongs to a membership set of the geo registry."""
+    return lambda chunk: geo.is_member(chunk[column], members)
+
+
+def read_csv_filtered(
+    path: str,
+    predicates: Iterable[Predicate] = (),
+    schema: DatasetSchema = None,
+    columns: Iterable[str] = None,
+    select: Iterable[str] = None,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    cached: bool = False,
+    **kwargs,
+) -> DataFrame:
+    """
+    Stream a csv file in chunks keeping only the rows that satisfy every predicate.
+
+    Each chunk is filtered as soon as it is parsed and only the surviving rows are kept,
+    so the peak memory is bounded by one chunk plus the output instead of the whole file.
+    The result is the same (rows, order and index) of reading the whole file and then
+    filtering it.
+
+    :param path: The path of the dataset.
+    :param predicates: The row filters, see `equals`, `is_null`, `member_of`, ...
+    :param schema: The schema (columns and dtypes) to apply, by default the one registered
+        for the file name if any.
+    :param columns: The columns to read, replaces the columns of the schema.
+    :param select: The columns kept after filtering each chunk (by default all the columns
+        read), e.g. to discard the columns used only by the predicates.
+    :param chunksize: The number of rows parsed at once.
+    :param cached: Take the parsed file from the parse cache (see `data_processing.cache`)
+        and filter it at once instead of streaming it: faster for the files that are
+        read often, but the whole file is in memory.
+    :param kwargs: Other options for `pd.read_csv`.
+    :return: The filtered dataframe.
+    """
+
+    if schema is None:
+        schema = SCHEMAS.get(schema_name(path))
+
+    options = schema.read_options() if schema is not None else {}
+    if columns is not None:
+        options["usecols"] = list(columns)
+    options.update(kwargs)
+
+    predicates = list(predicates)
+    select = slice(None) if select is None else list(select)
+
+    def filter_chunk(chunk):
+        mask = np.ones(len(chunk), dtype=bool)
+        for predicate in predicates:
+            mask &= predicate(chunk)
+        return chunk.loc[mask, select]
+
+    if cached:
+        df = filter_chunk(cached_read_csv(path, **options))
+    else:
+        with pd.read_csv(path, chunksize=chunksize, **options) as reader:
+            survivors = [filter_chunk(chunk) for chunk in reader]
+
+        if not survivors:
+            return pd.read_csv(path, nrows=0, **options).loc[:, select]
+
+        df = pd.concat(survivors)
+
+    # The categories are the values of the rows kept, whatever the chunks (chunks with
+    # different categories are concatenated as objects)
+    for column, dtype in options.get("dtype", {}).items():
+        if dtype == "category" and column in df.columns:
+            if df[column].dtype != "category":
+                df[column] = df[column].astype("category")
+            else:
+                df[column] = df[column].cat.remove_unused_categories()
+
+    return df
+
+
+class LoadedFrames(dict):
+    """The frames returned by `load_many` (name -> frame), with the load time of each one."""
+
+    def __init__(self, frames: dict, seconds: dict):
+        super().__init__(frames)
+        self.seconds = seconds
+
+    def report(self) -> str:
+        width = max((len(name) for name in self.seconds), default=0)
+        return "\n".join(
+            f"{name:<{width}}  {seconds * 1000:8.1f} ms  {len(self[name]):>8} rows"
+            for name, seconds in sorted(self.seconds.items(), key=lambda item: -item[1])
+        )
+
+
+def load_many(
+    sources: Mapping[str, object],
+    load: Callable[..., DataFrame] = None,
+    max_workers: int = None,
+    **options,
+) -> LoadedFrames:
+    """
+    Load several files at once on a thread pool (the csv parser of pandas releases the
+    GIL), so the wall time is bounded by the slowest file instead of the sum, e.g.
+
+        frames = load_many({"ia": ia_path, "iu": (iu_path, {"predicates": [...]})}, load_csv)
+        print(frames.report())
+
+    :param sources: name -> path, or name -> (path, options of that file only).
+    :param load: The function called as `load(path, **options)`, by default
+        `cached_read_csv` (see `data_processing.cache`).
+    :param max_workers: The number of files loaded at once, by default one per file.
+    :param options: The options shared by all the files.
+    :return: The frames by name (in the order of `sources`) with the load time of each one.
+    """
+
+    load = load or cached_read_csv
+
+    def timed_load(source):
+        path, file_options = source if isinstance(source, tuple) else (source, {})
+        start = time.perf_counter()
+        df = load(path, **{**options, **file_options})
+        return df, time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=max_workers or max(len(sources), 1)) as executor:
+        futures = {name: executor.submit(timed_load, source) for name, source in sources.items()}
+        results = {name: future.result() for name, future in futures.items()}
+
+    return LoadedFrames(
+        {name: df for name, (df, _) in results.items()},
+        {name: seconds for name, (_, seconds) in results.items()},
+    )
@@ -0,0 +1,176 @@
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+# Declarative definitions of the derived metrics of a panel (one row per entity and
+# year). A metric can use the columns of the frame and the metrics defined before it.
+
+
+class Sum(NamedTuple):
+    """The sum of some columns, the missing values count as zero (like `sum(axis=1)`)."""
+
+    name: str
+    columns: tuple
+
+
+class Ratio(NamedTuple):
+    """`numerator / denominator * scale`, e.g. per capita or per km² variants."""
+
+    name: str
+    numerator: str
+    denominator: str
+    scale: float = 1.0
+
+
+class Share(NamedTuple):
+    """The percentage of a part on a total, e.g. the share of an energy source."""
+
+    name: str
+    part: str
+    total: str
+
+
+class PctChange(NamedTuple):
+    """The change from `periods` rows before of the same entity, as a fraction (no fill)."""
+
+    name: str
+    column: str
+    periods: int = 1
+
+
+class RollingMean(NamedTuple):
+    """
+    The mean of the last `window` rows of the same entity (the row included), NaN when
+    there are less than `min_periods` values (by default `window`), like `rolling().mean()`.
+    """
+
+    name: str
+    column: str
+    window: int
+    min_periods: int = None
+
+
+_ORDERED_METRICS = (PctChange, RollingMean)
+
+
+def _inputs(metric) -> tuple:
+    if isinstance(metric, Sum):
+        return tuple(metric.columns)
+    if isinstance(metric, Ratio):
+        return metric.numerator, metric.denominator
+    if isinstance(metric, Share):
+        return metric.part, metric.total
+    if isinstance(metric, (PctChange, RollingMean)):
+        return (metric.column,)
+    raise TypeError(f"Unknown metric {metric!r}")
+
+
+def _rolling_mean(values, out, window, min_periods, first_rows):
+    # Windowed sums as differences of cumulative sums, the windows never cross the
+    # first row of the entity
+    valid = ~np.isnan(values)
+    sums = np.concatenate([[0.0], np.cumsum(np.where(valid, values, 0.0))])
+    counts = np.concatenate([[0], np.cumsum(valid)])
+    rows = np.arange(len(values))
+    low = np.maximum(rows - window + 1, first_rows)
+    window_counts = counts[rows + 1] - counts[low]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        np.divide(sums[rows + 1] - sums[low], window_counts, out=out)
+    out[window_counts < min_periods] = np.nan
+
+
+def evaluate(df: DataFrame, metrics: list, entity: str = None, year: str = None) -> DataFrame:
+    """
+    Compute the derived metrics of a panel, e.g.
+
+        df = evaluate(df, [
+            Sum("total", sources),
+            *(Share(f"{source} - share", source, "total") for source in sources),
+            Ratio("total per capita", "total", "population"),
+            PctChange("total growth", "total"),
+        ], entity="Country", year="Year")
+
+    The columns used by the metrics are copied once in a contiguous float block (sorted
+    by entity and year when a metric depends on the previous years) and every metric is
+    computed in place in its own row of the block, so the intermediate metrics do not
+    create columns of the frame; the metrics are added to the frame at the end, in the
+    original order of the rows.
+
+    :param df: The panel.
+    :param metrics: The metric definitions, in order.
+    :param entity: The column of the entities (e.g. the country), required by
+        `PctChange` and `RollingMean`.
+    :param year: The column of the years, required by `PctChange` and `RollingMean`.
+    :return: A copy of `df` with a column for every metric.
+    """
+
+    metrics = list(metrics)
+    names = [metric.name for metric in metrics]
+    if len(set(names)) != len(names):
+        raise ValueError("The metric names must be unique")
+    for metric in metrics:
+        if isinstance(metric, Sum) and len(metric.columns) == 0:
+            raise ValueError(f"`{metric.name}` sums no columns")
+
+    columns = []
+    for position, metric in enumerate(metrics):
+        for column in _inputs(metric):
+            if column in names[:position] or column in columns:
+                continue
+            if column not in df.columns:
+                raise KeyError(f"`{metric.name}` uses `{column}`, that is not a column or a previous metric")
+            columns.append(column)
+
+    order = None
+    first_rows = None
+    if any(isinstance(metric, _ORDERED_METRICS) for metric in metrics):
+        if entity is None or year is None:
+            raise ValueError("The entity and the year columns are required by PctChange and RollingMean")
+        entity_codes, _ = pd.factorize(df[entity])
+        order = np.lexsort((df[year].to_numpy(), entity_codes))
+        sorted_codes = entity_codes[order]
+        starts = np.r_[True, sorted_codes[1:] != sorted_codes[:-1]]
+        # The position of the first row of the entity of every row
+        first_rows = np.maximum.accumulate(np.where(starts, np.arange(len(df)), 0))
+
+    rows = {}
+    block = np.empty((len(columns) + len(metrics), len(df)), dtype=np.float64)
+    for position, column in enumerate(columns):
+        values = df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+        block[position] = values if order is None else values[order]
+        rows[column] = block[position]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for position, metric in enumerate(metrics, start=len(columns)):
+            out = block[position]
+            if isinstance(metric, Sum):
+                # Summed along the rows of a row major copy, the same order of the
+                # additions (and so the same rounding) of `DataFrame.sum(axis=1)`
+                values = np.stack([rows[column] for column in metric.columns], axis=1)
+                np.nan_to_num(values, copy=False)
+                np.sum(values, axis=1, out=out)
+            elif isinstance(metric, Ratio):
+                np.divide(rows[metric.numerator], rows[metric.denominator], out=out)
+                if metric.scale != 1.0:
+                    out *= metric.scale
+            elif isinstance(metric, Share):
+                np.divide(rows[metric.part], rows[metric.total], out=out)
+                out *= 100.0
+            elif isinstance(metric, PctChange):
+                values = rows[metric.column]
+                out[:] = np.nan
+                current = np.flatnonzero(np.arange(len(df)) - first_rows >= metric.periods)
+                out[current] = values[current] / values[current - metric.periods] - 1.0
+            elif isinstance(metric, RollingMean):
+                min_periods = metric.window if metric.min_periods is None else metric.min_periods
+                _rolling_mean(rows[metric.column], out, metric.window, min_periods, first_rows)
+            rows[metric.name] = out
+
+    results = block[len(columns):]
+    if order is not None:
+        unsorted = np.empty_like(results)
+        unsorted[:, order] = results
+        results = unsorted
+    return df.assign(**dict(zip(names, results)))
@@ -0,0 +1,374 @@
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import NamedTuple
+
+from data_processing.utils import file_sha256
+
+# Status of a pipeline after a run
+SUCCEEDED = "ok"
+FAILED = "failed"
+SKIPPED = "skipped"
+UP_TO_DATE = "fresh"
+
+# Bump to invalidate every fingerprint recorded by older versions of the runner
+FINGERPRINT_VERSION = 1
+
+
+class Pipeline(NamedTuple):
+    """
+    A node of the build graph: a script with the files it reads and the files it writes.
+
+    The dependencies are not declared, they are inferred: a pipeline depends on the
+    pipelines that write one of its inputs.
+    """
+
+    name: str
+    script: str
+    # Working directory of the script (many scripts build their paths from `os.getcwd()`)
+    cwd: str
+    inputs: tuple = ()
+    outputs: tuple = ()
+    # Other source files the script depends on (modules, lookup tables, ...)
+    code: tuple = ()
+    # Command line arguments of the script
+    args: tuple = ()
+    # The program that runs the script, by default the current Python interpreter
+    command: tuple = ()
+
+
+class PipelineResult(NamedTuple):
+    name: str
+    status: str
+    seconds: float
+    # Captured stdout and stderr of the script
+    log: str = ""
+
+
+def _normalize(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path))
+
+
+class BuildManifest:
+    """
+    The fingerprints of the last successful run of every pipeline, stored as JSON.
+
+    The fingerprint of a pipeline is a hash of the content of its script, of its code
+    files, of its input files and of its arguments. A pipeline is up to date when its
+    fingerprint is the recorded one and all its outputs exist.
+
+    The digests of the files are cached with their size and modification time, so the
+    content of a file is hashed again only when it changes on disk.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.files = {}
+        self.pipelines = {}
+        if os.path.exists(path):
+            with open(path, "r") as manifest_file:
+                manifest = json.load(manifest_file)
+            if manifest.get("version") == FINGERPRINT_VERSION:
+                self.files = manifest["files"]
+                self.pipelines = manifest["pipelines"]
+
+    def file_digest(self, path: str) -> str:
+        """
+        The sha256 of the content of a file, `missing` if it does not exist.
+
+        :param path: The path of the file.
+        :return: The hex digest.
+        """
+
+        key = _normalize(path)
+        try:
+            stat = os.stat(key)
+        except FileNotFoundError:
+            return "missing"
+
+        cached = self.files.get(key)
+        if cached is not None and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+
+        self.files[key] = [stat.st_size, stat.st_mtime_ns, file_sha256(key)]
+        return self.files[key][2]
+
+    def fingerprint(self, pipeline: Pipeline) -> str:
+        """
+        The fingerprint of a pipeline computed from the current content of its files.
+
+        :param pipeline: The pipeline.
+        :return: The hex digest.
+        """
+
+        digest = hashlib.sha256()
+        digest.update(json.dumps([FINGERPRINT_VERSION, list(pipeline.args), list(pipeline.command)]).encode())
+        for group in ((pipeline.script,), pipeline.code, pipeline.inputs):
+            for path in group:
+                digest.update(f"{_normalize(path)}={self.file_digest(path)};".encode())
+            digest.update(b"|")
+        return digest.hexdigest()
+
+    def is_up_to_date(self, pipeline: Pipeline, fingerprint: str) -> bool:
+        return self.pipelines.get(pipeline.name) == fingerprint and all(
+            os.path.exists(output) for output in pipeline.outputs
+        )
+
+    def record(self, pipeline: Pipeline, fingerprint: str):
+        self.pipelines[pipeline.name] = fingerprint
+        self.save()
+
+    def forget(self, pipeline: Pipeline):
+        if self.pipelines.pop(pipeline.name, None) is not None:
+            self.save()
+
+    def save(self):
+        """Write the manifest atomically (a temporary file renamed over the old one)."""
+
+        folder = os.path.dirname(os.path.abspath(self.path))
+        descriptor, temporary_path = tempfile.mkstemp(dir=folder, suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "w") as manifest_file:
+                json.dump(
+                    {"version": FINGERPRINT_VERSION, "files": self.files, "pipelines": self.pipelines},
+                    manifest_file,
+                    indent=1,
+                    sort_keys=True,
+                )
+            os.replace(temporary_path, self.path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+
+
+def build_graph(pipelines: list) -> dict:
+    """
+    Infer the dependencies between the pipelines from their inputs and outputs.
+
+    :param pipelines: The pipelines.
+    :return: A dict that maps the name of each pipeline to the set of names of the
+        pipelines it depends on.
+    """
+
+    names = [pipeline.name for pipeline in pipelines]
+    if len(set(names)) != len(names):
+        raise ValueError("The pipeline names must be unique")
+
+    producers = {}
+    for pipeline in pipelines:
+        for output in pipeline.outputs:
+            output = _normalize(output)
+            if output in producers:
+                raise ValueError(
+                    f"`{output}` is written by both `{producers[output]}` and `{pipeline.name}`"
+                )
+            producers[output] = pipeline.name
+
+    graph = {
+        pipeline.name: {
+            producers[_normalize(path)]
+            for path in pipeline.inputs
+            if _normalize(path) in producers and producers[_normalize(path)] != pipeline.name
+        }
+        for pipeline in pipelines
+    }
+    topological_order(graph)
+    return graph
+
+
+def topological_order(graph: dict) -> list:
+    """
+    Order the pipelines so that every pipeline comes after its dependencies.
+
+    :param graph: The dependencies, as returned by `build_graph`.
+    :return: The list of names.
+    """
+
+    order = []
+    state = {}
+
+    def visit(name, path):
+        if state.get(name) == "done":
+            return
+        if state.get(name) == "visiting":
+            raise ValueError("Dependency cycle: " + " -> ".join(path + [name]))
+        state[name] = "visiting"
+        for dependency in sorted(graph[name]):
+            visit(dependency, path + [name])
+        state[name] = "done"
+        order.append(name)
+
+    for name in graph:
+        visit(name, [])
+    return order
+
+
+def critical_path(graph: dict, seconds: dict) -> tuple:
+    """
+    The longest chain of dependent pipelines, that is the lower bound of the wall time
+    of a rebuild with enough workers.
+
+    :param graph: The dependencies, as returned by `build_graph`.
+    :param seconds: The duration of each pipeline.
+    :return: The list of names on the path and its total duration.
+    """
+
+    finish = {}
+    previous = {}
+    for name in topological_order(graph):
+        start = 0.0
+        previous[name] = None
+        for dependency in graph[name]:
+            if finish[dependency] > start:
+                start = finish[dependency]
+                previous[name] = dependency
+        finish[name] = start + seconds.get(name, 0.0)
+
+    if not finish:
+        return [], 0.0
+
+    last = max(finish, key=finish.get)
+    path = []
+    name = last
+    while name is not None:
+        path.append(name)
+        name = previous[name]
+    return path[::-1], finish[last]
+
+
+def run_script(pipeline: Pipeline) -> PipelineResult:
+    """
+    Run the script of a pipeline in its own Python process, from its working directory.
+
+    :param pipeline: The pipeline.
+    :return: The result, with the captured output.
+    """
+
+    command = list(pipeline.command) or [sys.executable]
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [*command, os.path.abspath(pipeline.script), *pipeline.args],
+        cwd=pipeline.cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+    )
+    status = SUCCEEDED if completed.returncode == 0 else FAILED
+    return PipelineResult(pipeline.name, status, time.perf_counter() - start, completed.stdout)
+
+
+def run_pipelines(
+    pipelines: list,
+    max_workers: int = None,
+    verbose: bool = False,
+    manifest: BuildManifest = None,
+    force: bool = False,
+) -> dict:
+    """
+    Run the pipelines in dependency order, the independent ones in parallel.
+
+    Every script runs in a separate process (the scripts do their work at import time
+    and change global state, so they are never imported in the runner). A pipeline
+    starts as soon as all its dependencies are done; the dependents of a failed pipeline
+    are skipped.
+
+    With a manifest, a pipeline whose fingerprint did not change since its last
+    successful run (and whose outputs exist) is not run. The fingerprint is computed
+    when the dependencies are done, so a pipeline downstream of a rebuilt one is run
+    only if the rebuilt outputs are actually different.
+
+    :param pipelines: The pipelines to run.
+    :param max_workers: The number of pipelines run at once, by default the number of CPUs.
+    :param verbose: Print the output of every script, not only of the failed ones.
+    :param manifest: The build manifest, if None every pipeline is run.
+    :param force: Run every pipeline even if it is up to date (the manifest is updated).
+    :return: A dict that maps the name of each pipeline to its `PipelineResult`.
+    """
+
+    graph = build_graph(pipelines)
+    by_name = {pipeline.name: pipeline for pipeline in pipelines}
+    waiting = {name: set(dependencies) for name, dependencies in graph.items()}
+    fingerprints = {}
+    results = {}
+
+    def skip_dependents(name):
+        for other, dependencies in graph.items():
+            if name in dependencies and other not in results:
+                results[other] = PipelineResult(other, SKIPPED, 0.0)
+                waiting.pop(other, None)
+                skip_dependents(other)
+
+    def complete(result):
+        results[result.name] = result
+        print(f"[{result.status}] {result.name} ({result.seconds:.2f} s)")
+
+        if result.status == FAILED:
+            print(result.log)
+            if manifest is not None:
+                manifest.forget(by_name[result.name])
+            skip_dependents(result.name)
+            return
+
+        if verbose and result.log:
+            print(result.log)
+        if manifest is not None and result.status == SUCCEEDED:
+            manifest.record(by_name[result.name], fingerprints[result.name])
+        for dependencies in waiting.values():
+            dependencies.discard(result.name)
+
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        running = {}
+        while waiting or running:
+            ready = [name for name, dependencies in waiting.items() if not dependencies]
+            for name in ready:
+                del waiting[name]
+                if manifest is not None:
+                    fingerprints[name] = manifest.fingerprint(by_name[name])
+                    if not force and manifest.is_up_to_date(by_name[name], fingerprints[name]):
+                        complete(PipelineResult(name, UP_TO_DATE, 0.0))
+                        continue
+                print(f"[start] {name}")
+                running[executor.submit(run_script, by_name[name])] = name
+
+            if not running:
+                # Only up to date pipelines in this round, their dependents are ready now
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                del running[future]
+                complete(future.result())
+
+    return results
+
+
+def format_summary(pipelines: list, results: dict, wall_seconds: float) -> str:
+    """
+    The timing report of a run: the duration of every pipeline, the critical path,
+    the sum of the durations (the time of a sequential run) and the wall time.
+
+    :param pipelines: The pipelines.
+    :param results: The results returned by `run_pipelines`.
+    :param wall_seconds: The wall time of the run.
+    :return: The report.
+    """
+
+    graph = build_graph(pipelines)
+    seconds = {name: result.seconds for name, result in results.items()}
+    path, path_seconds = critical_path(graph, seconds)
+    width = max((len(name) for name in graph), default=0)
+
+    lines = [f"{'pipeline':<{width}}  {'status':<7}  seconds"]
+    for name in topological_order(graph):
+        result = results.get(name, PipelineResult(name, SKIPPED, 0.0))
+        lines.append(f"{name:<{width}}  {result.status:<7}  {result.seconds:7.2f}")
+    lines.append("")
+    lines.append(f"Critical path: {' -> '.join(path)} ({path_seconds:.2f} s)")
+    lines.append(f"Sequential time: {sum(seconds.values()):.2f} s")
+    lines.append(f"Wall time: {wall_seconds:.2f} s")
+    return "\n".join(lines)
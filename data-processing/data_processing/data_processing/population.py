@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+
+class PopulationIndex:
+    """
+    An immutable lookup table of the population keyed by year, country and age group
+    (or any other key columns), to attach the population to the survey datasets.
+
+    The population is stored in a dense array with one axis for every key, so attaching
+    it to a frame is an indexer lookup per key column and a single gather, e.g.
+
+        population = PopulationIndex(df_p, ["TIME_PERIOD", "geo", "age"], "OBS_VALUE")
+        df_iu = population.attach(df_iu, ["TIME_PERIOD", "geo", "ind_type"])
+        df_cu = population.attach(df_cu, ["TIME_PERIOD", "geo", "ind_type"])
+    """
+
+    __slots__ = ("_keys", "_labels", "_values")
+
+    def __init__(self, df: DataFrame, keys: list, value: str = "OBS_VALUE"):
+        """
+        :param df: The population, one row per combination of keys.
+        :param keys: The key columns.
+        :param value: The column of the population.
+        """
+
+        keys = tuple(keys)
+        codes = []
+        labels = []
+        for key in keys:
+            key_codes, uniques = pd.factorize(df[key], sort=True)
+            if (key_codes < 0).any():
+                raise ValueError(f"The key column `{key}` has missing values")
+            codes.append(key_codes)
+            labels.append(pd.Index(np.asarray(uniques)))
+
+        values = np.full(tuple(len(key_labels) for key_labels in labels), np.nan)
+        counts = np.zeros(values.shape, dtype=np.intp)
+        np.add.at(counts, tuple(codes), 1)
+        if (counts > 1).any():
+            raise ValueError(f"The population has more than one row for some combination of {list(keys)}")
+        values[tuple(codes)] = df[value].to_numpy(dtype=np.float64)
+        values.setflags(write=False)
+
+        object.__setattr__(self, "_keys", keys)
+        object.__setattr__(self, "_labels", tuple(labels))
+        object.__setattr__(self, "_values", values)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("PopulationIndex is immutable")
+
+    @property
+    def keys(self) -> tuple:
+        return self._keys
+
+    def lookup(self, *columns) -> np.ndarray:
+        """
+        The population of every combination of keys, NaN for the missing ones.
+
+        :param columns: One array-like of labels for every key, in the order of `keys`.
+        :return: The population, a float array.
+        """
+
+        if len(columns) != len(self._keys):
+            raise ValueError(f"Expected {len(self._keys)} key columns, got {len(columns)}")
+
+        positions = [
+            key_labels.get_indexer(np.asarray(column))
+            for key_labels, column in zip(self._labels, columns)
+        ]
+        found = np.logical_and.reduce([key_positions >= 0 for key_positions in positions])
+        result = np.full(len(found), np.nan)
+        result[found] = self._values[tuple(key_positions[found] for key_positions in positions)]
+        return result
+
+    def attach(self, df: DataFrame, on: list, name: str = "Population") -> DataFrame:
+        """
+        Add the population to a frame, like a left merge on the key columns.
+
+        :param df: The frame, e.g. a survey dataset.
+        :param on: The columns of `df` that match the keys of the index, in the same order.
+        :param name: The name of the new column.
+        :return: A copy of `df` with the population column (NaN where there is no match).
+        """
+
+        return df.assign(**{name: self.lookup(*(df[column] for column in on))})
+
+
+def weighted_mean(df: DataFrame, value: str, weight: str, by: list = ()):
+    """
+    The mean of a column weighted by another one (e.g. the percentage of individuals
+    weighted by the population), overall or for every group, with a single
+    `np.bincount` on the group codes instead of a merge and a groupby.
+
+    The rows where the value or the weight is missing are ignored.
+
+    :param df: The frame.
+    :param value: The column to average.
+    :param weight: The column of the weights.
+    :param by: The columns of the groups, if empty the overall mean is returned.
+    :return: The mean (a float, NaN if there are no weights), or a frame with the
+        columns in `by` and the mean in `value`, sorted by group.
+    """
+
+    values = df[value].to_numpy(dtype=np.float64)
+    weights = df[weight].to_numpy(dtype=np.float64)
+    valid = ~(np.isnan(values) | np.isnan(weights))
+
+    by = list(by)
+    if not by:
+        total = weights[valid].sum()
+        return float((values[valid] * weights[valid]).sum() / total) if total else np.nan
+
+    codes = np.zeros(len(df), dtype=np.int64)
+    uniques = []
+    for column in by:
+        column_codes, column_uniques = pd.factorize(df[column], sort=True)
+        valid &= column_codes >= 0
+        codes = codes * len(column_uniques) + column_codes
+        uniques.append(column_uniques)
+
+    codes, groups = pd.factorize(codes[valid], sort=True)
+    sums = np.bincount(codes, weights=values[valid] * weights[valid], minlength=len(groups))
+    totals = np.bincount(codes, weights=weights[valid], minlength=len(groups))
+
+    columns = {}
+    remainder = groups
+    group_codes = []
+    for column_uniques in reversed(uniques):
+        remainder, column_codes = np.divmod(remainder, len(column_uniques))
+        group_codes.append(column_codes)
+    for column, column_uniques, column_codes in zip(by, uniques, reversed(group_codes)):
+        columns[column] = column_uniques.take(column_codes)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        columns[value] = np.where(totals != 0, sums / totals, np.nan)
+    return DataFrame(columns)
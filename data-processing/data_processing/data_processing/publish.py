@@ -0,0 +1,252 @@
+import glob
+import json
+import os
+import shutil
+import sys
+import uuid
+from typing import Callable, Iterable
+
+from pandas import DataFrame
+
+from data_processing.utils import create_and_check_dir, file_sha256
+
+# Name of the manifest written in every published folder
+MANIFEST_NAME = "manifest.json"
+
+
+def _temporary_path(destination: str) -> str:
+    # Hidden file in the same folder of the destination, so the rename is atomic
+    folder, name = os.path.split(destination)
+    return os.path.join(folder, f".{name}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp")
+
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _link_or_copy(source: str, destination: str):
+    # Hardlink (or copy when the destination is on another file system) to a temporary
+    # file, then rename it over the destination
+    temporary_path = _temporary_path(destination)
+    try:
+        try:
+            os.link(source, temporary_path)
+        except OSError:
+            shutil.copyfile(source, temporary_path)
+        os.replace(temporary_path, destination)
+    except BaseException:
+        _remove_quietly(temporary_path)
+        raise
+
+
+def publish(write: Callable[[str], None], destinations: Iterable[str]):
+    """
+    Serialize a dataset once and publish it to every destination.
+
+    `write` is called once with a temporary path next to the first destination; the
+    other destinations get a hardlink of the written file (a copy if they are on another
+    file system) and every file is renamed over its destination only when it is
+    complete, so a reader (e.g. the dev server of the web application) sees either the
+    old file or the new one, never a half written one.
+
+    The destination folders are created if they do not exist.
+
+    :param write: A function that writes the dataset to the given path.
+    :param destinations: The paths where the dataset is published.
+    """
+
+    destinations = [os.path.abspath(destination) for destination in destinations]
+    if not destinations:
+        raise ValueError("At least one destination is required")
+    for destination in destinations:
+        create_and_check_dir(os.path.dirname(destination))
+
+    temporary_path = _temporary_path(destinations[0])
+    try:
+        write(temporary_path)
+        for destination in destinations[1:]:
+            _link_or_copy(temporary_path, destination)
+        os.replace(temporary_path, destinations[0])
+    except BaseException:
+        _remove_quietly(temporary_path)
+        raise
+
+
+def publish_csv(dataframe: DataFrame, destinations: Iterable[str], **kwargs):
+    """
+    Write a dataframe as csv once and publish it to every destination, see `publish`.
+
+    :param dataframe: The dataframe.
+    :param destinations: The paths where the csv is published.
+    :param kwargs: Options for `DataFrame.to_csv`, e.g. `index=False`.
+    """
+
+    publish(lambda path: dataframe.to_csv(path, **kwargs), destinations)
+
+
+def publish_file(source: str, destinations: Iterable[str]):
+    """
+    Publish an existing file to every destination (hardlink or copy, then atomic rename).
+
+    :param source: The path of the file.
+    :param destinations: The paths where the file is published.
+    """
+
+    for destination in destinations:
+        if os.path.exists(destination) and os.path.samefile(source, destination):
+            continue
+        create_and_check_dir(os.path.dirname(os.path.abspath(destination)))
+        _link_or_copy(source, destination)
+
+
+def load_manifest(folder: str) -> dict:
+    """
+    The manifest of a published folder, empty if the folder has none.
+
+    :param folder: The published folder.
+    :return: A dict that maps the name of every file (relative to the folder, with `/`
+        separators) to its `size`, `mtime_ns` and `sha256`.
+    """
+
+    path = os.path.join(folder, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as manifest_file:
+        return json.load(manifest_file)["files"]
+
+
+def write_manifest(folder: str, files: dict):
+    """
+    Write the manifest of a published folder (atomically, like the datasets).
+
+    The web application can use the `sha256` of a file to build cache busting urls.
+
+    :param folder: The published folder.
+    :param files: The manifest entries, see `load_manifest`.
+    """
+
+    content = json.dumps({"files": files}, indent=2, sort_keys=True) + "\n"
+
+    def write(path):
+        with open(path, "w") as manifest_file:
+            manifest_file.write(content)
+
+    publish(write, [os.path.join(folder, MANIFEST_NAME)])
+
+
+def _file_entry(path: str, previous: dict = None) -> dict:
+    # The digest is computed again only if the size or the modification time changed
+    stat = os.stat(path)
+    if (
+        previous is not None
+        and previous["size"] == stat.st_size
+        and previous["mtime_ns"] == stat.st_mtime_ns
+    ):
+        return previous
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": file_sha256(path)}
+
+
+def _list_files(folder: str, pattern: str) -> list:
+    # Names relative to the folder, with `/` separators also on Windows
+    return sorted(
+        os.path.relpath(path, folder).replace(os.sep, "/")
+        for path in glob.glob(os.path.join(folder, pattern), recursive=True)
+        if os.path.isfile(path) and os.path.basename(path) != MANIFEST_NAME
+    )
+
+
+def sync_folder(
+    source_folder: str,
+    public_folder: str,
+    pattern: str = "*.csv",
+    prune_unmanifested: bool = False,
+) -> dict:
+    """
+    Publish the files of a folder to a public folder, incrementally.
+
+    Only the files whose content changed since the last sync (or that are missing in
+    the public folder) are published; the files published by a previous sync that are
+    no longer in the source folder are removed (the other files of the public folder
+    are never touched, except with `prune_unmanifested`). The manifest of the public folder records the size, the
+    modification time and the sha256 of every published file.
+
+    When the public folder has no manifest yet (the first sync) all the files are
+    published and nothing is removed, unless `prune_unmanifested` is set: then every
+    file of the public folder that matches the pattern is taken as published by a
+    previous sync, and the ones that are not in the source folder are removed (only
+    for a public folder written by this sync alone).
+
+    :param source_folder: The folder with the files to publish.
+    :param public_folder: The destination folder.
+    :param pattern: The glob pattern of the files to publish, relative to the folder
+        (e.g. `**/*.csv` for the subfolders too).
+    :param prune_unmanifested: Without a manifest, remove the files that match the
+        pattern and are not in the source folder.
+    :return: A dict with the names of the `published`, `unchanged` and `removed` files.
+    """
+
+    previous = load_manifest(public_folder)
+    if prune_unmanifested and not os.path.exists(os.path.join(public_folder, MANIFEST_NAME)):
+        published = set(_list_files(public_folder, pattern))
+    else:
+        published = set(previous)
+    files = {}
+    summary = {"published": [], "unchanged": [], "removed": []}
+
+    for name in _list_files(source_folder, pattern):
+        source = os.path.join(source_folder, *name.split("/"))
+        destination = os.path.join(public_folder, *name.split("/"))
+        files[name] = _file_entry(source, previous.get(name))
+
+        if (
+            name in previous
+            and previous[name]["sha256"] == files[name]["sha256"]
+            and os.path.exists(destination)
+        ):
+            summary["unchanged"].append(name)
+            continue
+
+        publish_file(source, [destination])
+        summary["published"].append(name)
+
+    for name in sorted(published - set(files)):
+        _remove_quietly(os.path.join(public_folder, *name.split("/")))
+        summary["removed"].append(name)
+
+    if files != previous:
+        write_manifest(public_folder, files)
+    return summary
+
+
+def update_manifest(folder: str, pattern: str = "*.csv") -> dict:
+    """
+    Update the manifest of a folder whose files are published directly (e.g. by
+    `publish_csv`), hashing only the files that changed.
+
+    :param folder: The published folder.
+    :param pattern: The glob pattern of the files in the manifest.
+    :return: The manifest entries.
+    """
+
+    previous = load_manifest(folder)
+    files = {
+        name: _file_entry(os.path.join(folder, *name.split("/")), previous.get(name))
+        for name in _list_files(folder, pattern)
+    }
+    if files != previous:
+        write_manifest(folder, files)
+    return files
+
+
+if __name__ == "__main__":
+    # Usage: python -m data_processing.publish <web-application/public/datasets>
+    # Update the manifest of every dataset folder of the web application
+    datasets_folder = sys.argv[1]
+    for name in sorted(os.listdir(datasets_folder)):
+        folder = os.path.join(datasets_folder, name)
+        if os.path.isdir(folder):
+            entries = update_manifest(folder, "**/*.*")
+            print(f"{name}: {len(entries)} files")
@@ -0,0 +1,222 @@
+import numpy as np
+from pandas import DataFrame
+
+from data_processing.groups import group_codes, group_labels
+
+MONTHS = 12
+
+# Meteorological seasons, `MONTH_SEASONS[month - 1]` is the index of the season of a
+# month. December is in the winter of the following year (December 2000, January and
+# February 2001 are the winter 2001)
+SEASONS = ("winter", "spring", "summer", "autumn")
+MONTH_SEASONS = np.array([0, 0, 1, 1, 1, 2, 2, 2, 3, 3, 3, 0])
+MONTH_SEASON_YEAR_SHIFT = np.array([0] * 11 + [1])
+
+
+def period_start(years, period: int = 10) -> np.ndarray:
+    """The first year of the period of every year, e.g. the decade: 1987 -> 1980."""
+
+    return (np.asarray(years) // period) * period
+
+
+class Rollup:
+    """
+    The sums and the counts of the values of a panel in a dense (group, year, month)
+    array, from which every coarser granularity (years, seasons, decades, normals of a
+    baseline period and the anomalies) is computed without scanning the rows again.
+
+    Built from the rows with a single `np.bincount` (`from_monthly`, `from_yearly`) or
+    directly from a dense block (`from_cube`, e.g. an element of the `ClimateCube` of
+    assignment-4). The yearly panels (e.g. the OWID datasets) have a single "month".
+
+    The aggregates are the means of the values that are not missing, with the number
+    of values in the `count` column.
+    """
+
+    def __init__(self, sums: np.ndarray, counts: np.ndarray, groups: DataFrame, first_year: int, value: str):
+        """
+        :param sums: The sums, shape (groups, years, months), months is 12 or 1.
+        :param counts: The number of values of every sum, same shape.
+        :param groups: The labels of the groups, one row for every group.
+        :param first_year: The year of the first position of the year axis.
+        :param value: The name of the value column of the results.
+        """
+
+        self.sums = sums
+        self.counts = counts
+        self.groups = groups.reset_index(drop=True)
+        self.first_year = int(first_year)
+        self.value = value
+
+    @classmethod
+    def _from_rows(cls, df, value, by, year, months=None):
+        # The single scan of the rows: one cell code per row and a bincount of the
+        # values and of the rows of every cell
+        groups = group_codes(df, by)
+        years = df[year].to_numpy().astype(np.int64)
+        values = df[value].to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = (groups.codes >= 0) & ~np.isnan(values)
+        if not valid.any():
+            raise ValueError(f"No values in `{value}`")
+
+        first_year = int(years[valid].min())
+        nyears = int(years[valid].max()) - first_year + 1
+        nmonths = 1 if months is None else MONTHS
+        cells = (groups.codes[valid] * nyears + years[valid] - first_year) * nmonths
+        if months is not None:
+            cells += months[valid]
+        size = groups.ngroups * nyears * nmonths
+        sums = np.bincount(cells, weights=values[valid], minlength=size)
+        counts = np.bincount(cells, minlength=size)
+        shape = (groups.ngroups, nyears, nmonths)
+        return cls(sums.reshape(shape), counts.reshape(shape), group_labels(groups), first_year, value)
+
+    @classmethod
+    def from_monthly(cls, df: DataFrame, value: str, by: list, year: str = "year", month: str = "month") -> "Rollup":
+        """
+        :param df: The monthly values, one row for every group, year and month.
+        :param value: The column of the values.
+        :param by: The columns of the groups (e.g. the state).
+        :param year: The column of the years.
+        :param month: The column of the months (1 to 12).
+        :return: The roll-up.
+        """
+
+        months = df[month].to_numpy().astype(np.int64) - 1
+        if ((months < 0) | (months >= MONTHS)).any():
+            raise ValueError(f"The months in `{month}` must be between 1 and 12")
+        return cls._from_rows(df, value, by, year, months)
+
+    @classmethod
+    def from_yearly(cls, df: DataFrame, value: str, by: list, year: str = "Year") -> "Rollup":
+        """
+        :param df: The yearly values, one row for every group and year (e.g. an OWID panel).
+        :param value: The column of the values.
+        :param by: The columns of the groups (e.g. the entity).
+        :param year: The column of the years.
+        :return: The roll-up.
+        """
+
+        return cls._from_rows(df, value, by, year)
+
+    @classmethod
+    def from_cube(cls, block: np.ndarray, first_year: int, groups: DataFrame, value: str = "value") -> "Rollup":
+        """
+        :param block: The values, shape (groups, years, 12), NaN where missing.
+        :param first_year: The year of the first position of the year axis.
+        :param groups: The labels of the groups, one row for every group of the block.
+        :param value: The name of the value column of the results.
+        :return: The roll-up.
+        """
+
+        block = np.asarray(block, dtype=np.float64)
+        valid = ~np.isnan(block)
+        return cls(np.where(valid, block, 0.0), valid.astype(np.int64), groups, first_year, value)
+
+    @property
+    def monthly(self) -> bool:
+        return self.sums.shape[2] == MONTHS
+
+    @property
+    def years(self) -> np.ndarray:
+        return np.arange(self.first_year, self.first_year + self.sums.shape[1])
+
+    def _frame(self, sums, counts, columns: dict) -> DataFrame:
+        # One row for every cell with at least a value: the group labels, the given
+        # columns (arrays over the trailing axes of the cells), the mean and the count
+        cells = np.nonzero(counts)
+        frame = {key: self.groups[key].to_numpy()[cells[0]] for key in self.groups.columns}
+        for name, (axis, labels) in columns.items():
+            frame[name] = np.asarray(labels)[cells[axis]]
+        frame[self.value] = sums[cells] / counts[cells]
+        frame["count"] = counts[cells]
+        return DataFrame(frame)
+
+    def annual(self) -> DataFrame:
+        """The mean of every group and year."""
+
+        return self._frame(
+            self.sums.sum(axis=2), self.counts.sum(axis=2), {"year": (1, self.years)}
+        )
+
+    def seasonal(self) -> DataFrame:
+        """The mean of every group, year and season (see `SEASONS`), only for monthly values."""
+
+        if not self.monthly:
+            raise ValueError("The seasons need monthly values")
+
+        shape = (self.sums.shape[0], self.sums.shape[1] + 1, len(SEASONS))
+        sums = np.zeros(shape)
+        counts = np.zeros(shape, dtype=np.int64)
+        for month in range(MONTHS):
+            shift = MONTH_SEASON_YEAR_SHIFT[month]
+            season = MONTH_SEASONS[month]
+            sums[:, shift:shift + self.sums.shape[1], season] += self.sums[:, :, month]
+            counts[:, shift:shift + self.sums.shape[1], season] += self.counts[:, :, month]
+
+        years = np.arange(self.first_year, self.first_year + shape[1])
+        return self._frame(sums, counts, {"year": (1, years), "season": (2, SEASONS)})
+
+    def periods(self, period: int = 10) -> DataFrame:
+        """The mean of every group and period of years (e.g. the decades), see `period_start`."""
+
+        starts = period_start(self.years, period)
+        boundaries = np.flatnonzero(np.r_[True, starts[1:] != starts[:-1]])
+        sums = np.add.reduceat(self.sums.sum(axis=2), boundaries, axis=1)
+        counts = np.add.reduceat(self.counts.sum(axis=2), boundaries, axis=1)
+        return self._frame(sums, counts, {"period": (1, starts[boundaries])})
+
+    def _baseline(self, start_year: int, end_year: int) -> tuple:
+        start = max(start_year - self.first_year, 0)
+        end = min(end_year - self.first_year + 1, self.sums.shape[1])
+        if start >= end:
+            raise ValueError(f"No years of the baseline {start_year}-{end_year} in the data")
+        return self.sums[:, start:end].sum(axis=1), self.counts[:, start:end].sum(axis=1)
+
+    def normals(self, start_year: int, end_year: int) -> DataFrame:
+        """
+        The normals of the baseline period [start_year, end_year] (e.g. the 30 years from
+        1991 to 2020): the mean of every group and month over the years of the period
+        (of every group for the yearly values).
+        """
+
+        sums, counts = self._baseline(start_year, end_year)
+        if not self.monthly:
+            return self._frame(sums, counts, {})
+        return self._frame(sums, counts, {"month": (1, np.arange(1, MONTHS + 1))})
+
+    def anomalies(self, start_year: int, end_year: int) -> DataFrame:
+        """
+        The difference between the mean of every group, year (and month) and its normal
+        of the baseline period [start_year, end_year], see `normals`.
+        """
+
+        sums, counts = self._baseline(start_year, end_year)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            normals = sums / counts
+            deviations = self.sums - self.counts * normals[:, None, :]
+
+        columns = {"year": (1, self.years)}
+        if self.monthly:
+            columns["month"] = (2, np.arange(1, MONTHS + 1))
+        frame = self._frame(deviations, self.counts, columns)
+        # The cells of the groups (and months) without a normal have no anomaly
+        return frame[~np.isnan(frame[self.value].to_numpy())].reset_index(drop=True)
+
+    def all(self, baseline: tuple = None, period: int = 10) -> dict:
+        """
+        Every granularity at once: `annual`, `seasonal` (only for monthly values),
+        `periods` and, with a baseline (start year, end year), `normals` and `anomalies`.
+
+        :param baseline: The baseline period of the normals, e.g. (1991, 2020).
+        :param period: The length of the periods in years.
+        :return: A dict of frames by granularity name.
+        """
+
+        result = {"annual": self.annual(), "periods": self.periods(period)}
+        if self.monthly:
+            result["seasonal"] = self.seasonal()
+        if baseline is not None:
+            result["normals"] = self.normals(*baseline)
+            result["anomalies"] = self.anomalies(*baseline)
+        return result
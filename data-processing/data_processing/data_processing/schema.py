@@ -0,0 +1,247 @@
+import ntpath
+import os
+import sys
+from dataclasses import dataclass, field
+
+import pandas as pd
+from pandas import DataFrame
+
+from data_processing.cache import cached_read_csv
+
+# Column layouts of the Eurostat SDMX-CSV exports
+SDMX_IA_COLUMNS = (
+    "DATAFLOW", "LAST UPDATE", "freq", "unit", "hhtyp", "geo",
+    "TIME_PERIOD", "OBS_VALUE", "OBS_FLAG", "CONF_STATUS",
+)
+SDMX_IA_REASONS_COLUMNS = (
+    "DATAFLOW", "LAST UPDATE", "freq", "indic_is", "unit", "hhtyp", "geo",
+    "TIME_PERIOD", "OBS_VALUE", "OBS_FLAG", "CONF_STATUS",
+)
+SDMX_ICU_COLUMNS = (
+    "DATAFLOW", "LAST UPDATE", "freq", "indic_is", "unit", "ind_type", "geo",
+    "TIME_PERIOD", "OBS_VALUE", "OBS_FLAG", "CONF_STATUS",
+)
+SDMX_P_AGE_15_COLUMNS = (
+    "DATAFLOW", "LAST UPDATE", "freq", "unit", "age", "sex", "geo",
+    "TIME_PERIOD", "OBS_VALUE", "OBS_FLAG", "CONF_STATUS",
+)
+SDMX_P_AGE_GROUP_COLUMNS = (
+    "DATAFLOW", "LAST UPDATE", "freq", "unit", "sex", "age", "geo",
+    "TIME_PERIOD", "OBS_VALUE", "OBS_FLAG", "CONF_STATUS",
+)
+SDMX_ICT_AGE_COLUMNS = (
+    "DATAFLOW", "LAST UPDATE", "freq", "unit", "age", "geo",
+    "TIME_PERIOD", "OBS_VALUE", "OBS_FLAG", "CONF_STATUS",
+)
+# SDMX-CSV 2.1 with the labels next to the codes
+SDMX_ICT_ATT_LEVEL_COLUMNS = (
+    "STRUCTURE", "STRUCTURE_ID", "STRUCTURE_NAME", "freq", "Time frequency", "unit",
+    "Unit of measure", "isced11",
+    "International Standard Classification of Education (ISCED 2011)", "geo",
+    "Geopolitical entity (reporting)", "TIME_PERIOD", "Time", "OBS_VALUE",
+    "Observation value", "OBS_FLAG", "Observation status (Flag) V2 structure",
+    "CONF_STATUS", "Confidentiality status (flag)",
+)
+SDMX_ICT_SEX_COLUMNS = (
+    "STRUCTURE", "STRUCTURE_ID", "STRUCTURE_NAME", "freq", "Time frequency", "unit",
+    "Unit of measure", "sex", "Sex", "geo", "Geopolitical entity (reporting)",
+    "TIME_PERIOD", "Time", "OBS_VALUE", "Observation value", "OBS_FLAG",
+    "Observation status (Flag) V2 structure", "CONF_STATUS",
+    "Confidentiality status (flag)",
+)
+
+
+@dataclass(frozen=True)
+class DatasetSchema:
+    """
+    Declaration of a source dataset: every column of the file, the columns that the
+    pipelines use (the only ones read) and their dtypes.
+    """
+
+    name: str
+    columns: tuple
+    keep: tuple
+    dtypes: dict = field(default_factory=dict)
+
+    def __post_init__(self):
+        unknown = set(self.keep) - set(self.columns)
+        if unknown:
+            raise ValueError(f"`{self.name}` keeps columns that are not in the file: {unknown}")
+
+    def read_options(self) -> dict:
+        """The `usecols` and `dtype` options for `pd.read_csv`."""
+        return {
+            "usecols": list(self.keep),
+            "dtype": {column: dtype for column, dtype in self.dtypes.items() if column in self.keep},
+        }
+
+
+def sdmx_schema(
+    name: str, columns: tuple, keep: tuple, value_dtype: str = "float32", overrides: dict = None
+) -> DatasetSchema:
+    """
+    Schema of a Eurostat SDMX-CSV file: the repeated labels are categories, `TIME_PERIOD`
+    is an int16 and `OBS_VALUE` is a float32 (use `value_dtype="float64"` for counts that
+    do not fit the float32 precision, e.g. the population).
+
+    :param name: The file name of the dataset.
+    :param columns: Every column of the file.
+    :param keep: The columns to read.
+    :param value_dtype: The dtype of `OBS_VALUE`.
+    :param overrides: Dtypes that replace the default ones.
+    :return: The schema.
+    """
+
+    dtypes = {column: "category" for column in columns}
+    dtypes["TIME_PERIOD"] = "int16"
+    dtypes["OBS_VALUE"] = value_dtype
+    dtypes.update(overrides or {})
+    return DatasetSchema(name, columns, keep, dtypes)
+
+
+SCHEMAS = {
+    schema.name: schema
+    for schema in (
+        # internet-access-level
+        sdmx_schema(
+            "internet-access.csv", SDMX_IA_COLUMNS, ("geo", "TIME_PERIOD", "OBS_VALUE")
+        ),
+        sdmx_schema(
+            "reasons-not-have-internet-access.csv",
+            SDMX_IA_REASONS_COLUMNS,
+            ("indic_is", "geo", "TIME_PERIOD", "OBS_VALUE"),
+        ),
+        sdmx_schema(
+            "internet-use-divided-by-age-education-level.csv",
+            SDMX_ICU_COLUMNS,
+            ("indic_is", "ind_type", "geo", "TIME_PERIOD", "OBS_VALUE"),
+        ),
+        sdmx_schema(
+            "internet-use-divided-by-age-group.csv",
+            SDMX_ICU_COLUMNS,
+            ("indic_is", "ind_type", "geo", "TIME_PERIOD", "OBS_VALUE"),
+        ),
+        sdmx_schema(
+            "computer-use-divided-by-age-group.csv",
+            SDMX_ICU_COLUMNS,
+            ("indic_is", "ind_type", "geo", "TIME_PERIOD", "OBS_VALUE"),
+        ),
+        sdmx_schema(
+            "internet-use.csv", SDMX_ICU_COLUMNS, ("geo", "TIME_PERIOD", "OBS_VALUE")
+        ),
+        sdmx_schema(
+            "population-age-15.csv",
+            SDMX_P_AGE_15_COLUMNS,
+            ("geo", "TIME_PERIOD", "OBS_VALUE"),
+            value_dtype="float64",
+        ),
+        sdmx_schema(
+            "population-divided-by-age-group.csv",
+            SDMX_P_AGE_GROUP_COLUMNS,
+            ("age", "geo", "TIME_PERIOD", "OBS_VALUE"),
+            value_dtype="float64",
+            # The age bands are relabelled into the survey age groups
+            overrides={"age": "str"},
+        ),
+        # digital-skills
+        sdmx_schema(
+            "employed-persons-with-ict-education-by-age.csv",
+            SDMX_ICT_AGE_COLUMNS,
+            ("unit", "age", "geo", "TIME_PERIOD", "OBS_VALUE", "OBS_FLAG"),
+        ),
+        sdmx_schema(
+            "employed-persons-with-ict-education-by-att-level.csv",
+            SDMX_ICT_ATT_LEVEL_COLUMNS,
+            (
+                "Unit of measure",
+                "International Standard Classification of Education (ISCED 2011)",
+                "Geopolitical entity (reporting)",
+                "TIME_PERIOD",
+                "OBS_VALUE",
+                "OBS_FLAG",
+            ),
+        ),
+        sdmx_schema(
+            "employed-persons-with-ict-education-by-sex.csv",
+            SDMX_ICT_SEX_COLUMNS,
+            (
+                "Unit of measure",
+                "sex",
+                "Sex",
+                "Geopolitical entity (reporting)",
+                "TIME_PERIOD",
+                "OBS_VALUE",
+                "OBS_FLAG",
+            ),
+        ),
+    )
+}
+
+
+def schema_name(path: str) -> str:
+    """
+    The file name of a dataset path, the key of `SCHEMAS`. Both separators are split
+    on every platform, the scripts build Windows paths (with backslashes).
+    """
+
+    return ntpath.basename(path)
+
+
+def get_schema(path: str) -> DatasetSchema:
+    """
+    The schema registered for the file at the given path (looked up by file name).
+
+    :param path: The path of the dataset.
+    :return: The schema.
+    """
+
+    name = schema_name(path)
+    if name not in SCHEMAS:
+        raise KeyError(f"No schema registered for `{name}`")
+    return SCHEMAS[name]
+
+
+def read_csv(path: str, schema: DatasetSchema = None, **kwargs) -> DataFrame:
+    """
+    Read a dataset applying its schema at read time: only the kept columns are parsed
+    and they are materialized directly with the declared dtypes. The parsed frame is
+    cached, see `data_processing.cache`.
+
+    :param path: The path of the dataset.
+    :param schema: The schema, by default the one registered for the file name.
+    :param kwargs: Other options for `pd.read_csv`.
+    :return: The dataframe.
+    """
+
+    if schema is None:
+        schema = get_schema(path)
+    return cached_read_csv(path, **schema.read_options(), **kwargs)
+
+
+def memory_report(paths: list) -> DataFrame:
+    """
+    Compare, for every dataset, the memory of a plain `pd.read_csv` with the memory of
+    the same file read with its schema.
+
+    :param paths: The paths of the datasets (with a registered schema).
+    :return: A dataframe with one row per dataset.
+    """
+
+    rows = []
+    for path in paths:
+        plain = pd.read_csv(path).memory_usage(deep=True).sum()
+        compact = read_csv(path).memory_usage(deep=True).sum()
+        rows.append({
+            "dataset": os.path.basename(path),
+            "plain_mb": plain / 2**20,
+            "schema_mb": compact / 2**20,
+            "saved_mb": (plain - compact) / 2**20,
+            "saved_pct": 100 * (plain - compact) / plain,
+        })
+    return DataFrame(rows)
+
+
+if __name__ == "__main__":
+    # Usage: python -m data_processing.schema <dataset.csv>...
+    with pd.option_context("display.width", 200, "display.float_format", "{:.2f}".format):
+        print(memory_report(sys.argv[1:]).to_string(index=False))
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+from pandas import DataFrame, Series
+
+
+def _replace_all(value, old_values, new_values):
+    # Same result as chaining `Series.str.replace(old, new, regex=False)` on one value
+    if not isinstance(value, str):
+        return np.nan
+    for old, new in zip(old_values, new_values):
+        value = value.replace(old, new)
+    return value
+
+
+def remap_substrings(values: Series, old_values, new_values) -> Series:
+    """
+    Apply all the literal substring substitutions (old -> new, in order) to a column.
+
+    The substitutions are applied once per distinct value (the categories of a
+    categorical column or the uniques of `pd.factorize`) and the result is broadcasted
+    back with the integer codes, so the cost depends on the number of distinct labels
+    and not on rows x substitutions.
+
+    :param values: The column to remap.
+    :param old_values: The substrings to replace.
+    :param new_values: The replacements, one for each substring in `old_values`.
+    :return: The remapped column, categorical if the input is categorical.
+    """
+
+    if len(old_values) != len(new_values):
+        raise ValueError("old_values and new_values must have the same length")
+
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy()
+        uniques = values.cat.categories
+    else:
+        codes, uniques = pd.factorize(values)
+
+    remapped = [_replace_all(value, old_values, new_values) for value in uniques]
+
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Different categories can become the same label, merge them
+        new_codes, new_categories = pd.factorize(pd.Index(remapped, dtype=object))
+        codes = np.where(codes >= 0, new_codes[codes], -1)
+        categorical = pd.Categorical.from_codes(codes, categories=new_categories)
+        return Series(categorical, index=values.index, name=values.name)
+
+    # The missing values have code -1, that is the trailing NaN
+    lookup = np.array(remapped + [np.nan], dtype=object)
+    is_text = values.dtype == object or isinstance(values.dtype, pd.StringDtype)
+    return Series(
+        lookup[codes], index=values.index, name=values.name, dtype=values.dtype if is_text else object
+    )
+
+
+def replace_str(df: DataFrame, column, old_values, new_values) -> DataFrame:
+    """
+    Replace (literally, not as regex) every substring in `old_values` with the
+    corresponding one in `new_values` in the given column of the dataframe.
+
+    :param df: The dataframe.
+    :param column: The column name.
+    :param old_values: The substrings to replace.
+    :param new_values: The replacements, one for each substring in `old_values`.
+    :return: The dataframe with the column updated.
+    """
+
+    df[column] = remap_substrings(df[column], old_values, new_values)
+    return df
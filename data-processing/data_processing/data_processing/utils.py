@@ -1,3 +1,4 @@
+import hashlib
 import os
 import os.path as p
 
@@ -18,3 +19,18 @@ def create_and_check_dir(dir_path: str):
         os.makedirs(dir_path, exist_ok=True)
     elif not p.isdir(dir_path):
         raise ValueError(f"`{dir_path}` must be a folder")
+
+
+def file_sha256(path: str) -> str:
+    """
+    The sha256 of the content of a file, read in blocks.
+
+    :param path: The path of the file.
+    :return: The hex digest.
+    """
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
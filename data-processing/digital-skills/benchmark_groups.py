@@ -0,0 +1,148 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_processing.groups import (
+    group_codes,
+    group_first,
+    group_last,
+    group_mask,
+    group_mean,
+    group_nunique,
+    group_size,
+    group_sum,
+    top_k_mask,
+)
+from data_processing.loader import read_csv_filtered
+
+# Benchmark of the factorized group operators against the pandas equivalents
+#############################################################################
+
+CURRENT_DIRPATH = os.path.dirname(os.path.abspath(__file__))
+DATASET_PATH = os.path.join(
+    CURRENT_DIRPATH,
+    "employed-persons-with-ict-education-by-age",
+    "employed-persons-with-ict-education-by-age.csv",
+)
+KEYS = ["time_period", "geo"]
+SCALES = [1, 10, 100]
+REPEAT = 5
+
+
+def load_dataset(categorical: bool) -> pd.DataFrame:
+    # With the schema of the dataset (categorical labels, as read by the pipelines) or
+    # as plain strings
+    columns = ["age", "geo", "TIME_PERIOD", "OBS_VALUE", "OBS_FLAG"]
+    if categorical:
+        df = read_csv_filtered(DATASET_PATH, select=columns)
+    else:
+        df = pd.read_csv(DATASET_PATH, usecols=columns)
+    return df.rename(columns={"TIME_PERIOD": "time_period", "OBS_VALUE": "obs_value", "OBS_FLAG": "obs_flag"})
+
+
+def scale(df: pd.DataFrame, replicas: int) -> pd.DataFrame:
+    # Every replica is shifted to other years, so there are `replicas` times the groups
+    replicated = pd.concat([df] * replicas, ignore_index=True)
+    replicated["time_period"] = replicated["time_period"].astype(np.int64) + np.repeat(
+        np.arange(replicas) * 1000, len(df)
+    )
+    return replicated
+
+
+def best_of(repeat, function, *args) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+# The pandas version and the factorized version of every operation, both return the
+# rows of the filtered frame or one value for every group (in the order of the keys)
+
+
+def pandas_nunique_filter(df):
+    counts = df.groupby(KEYS, observed=True)["age"].nunique()
+    return df[df.set_index(KEYS).index.isin(counts[counts >= 2].index)]
+
+
+def groups_nunique_filter(df):
+    groups = group_codes(df, KEYS)
+    return df[group_mask(groups, group_nunique(groups, df["age"]) >= 2)]
+
+
+def pandas_size_filter(df):
+    return df[df.groupby(KEYS, observed=True)["age"].transform("size") >= 5]
+
+
+def groups_size_filter(df):
+    groups = group_codes(df, KEYS)
+    return df[group_mask(groups, group_size(groups) >= 5)]
+
+
+def pandas_first_last(df):
+    grouped = df.groupby(KEYS, observed=True)["obs_flag"]
+    return grouped.first().to_numpy(), grouped.last().to_numpy()
+
+
+def groups_first_last(df):
+    groups = group_codes(df, KEYS)
+    return group_first(groups, df["obs_flag"]).to_numpy(), group_last(groups, df["obs_flag"]).to_numpy()
+
+
+def pandas_sum_mean(df):
+    grouped = df.groupby(KEYS, observed=True)["obs_value"]
+    return grouped.sum().to_numpy(), grouped.mean().to_numpy()
+
+
+def groups_sum_mean(df):
+    groups = group_codes(df, KEYS)
+    return group_sum(groups, df["obs_value"]), group_mean(groups, df["obs_value"])
+
+
+def pandas_top_k(df):
+    return df[df.groupby("time_period")["obs_value"].rank(method="first", ascending=False) <= 3]
+
+
+def groups_top_k(df):
+    return df[top_k_mask(df["obs_value"], 3, group_codes(df, ["time_period"]))]
+
+
+OPERATIONS = [
+    ("nunique filter", pandas_nunique_filter, groups_nunique_filter),
+    ("size filter", pandas_size_filter, groups_size_filter),
+    ("first/last", pandas_first_last, groups_first_last),
+    ("sum/mean", pandas_sum_mean, groups_sum_mean),
+    ("top 3 per year", pandas_top_k, groups_top_k),
+]
+
+
+def check_same_result(expected, result):
+    if isinstance(expected, pd.DataFrame):
+        pd.testing.assert_frame_equal(expected, result)
+        return
+    for expected_values, values in zip(expected, result):
+        pd.testing.assert_series_equal(
+            pd.Series(expected_values, dtype=object).fillna(np.nan),
+            pd.Series(values, dtype=object).fillna(np.nan),
+        )
+
+
+if __name__ == "__main__":
+    for categorical in (True, False):
+        dataset = load_dataset(categorical)
+        print("Categorical labels" if categorical else "String labels")
+        for replicas in SCALES:
+            df = scale(dataset, replicas)
+            for label, pandas_operation, groups_operation in OPERATIONS:
+                check_same_result(pandas_operation(df), groups_operation(df))
+                pandas_seconds = best_of(REPEAT, pandas_operation, df)
+                groups_seconds = best_of(REPEAT, groups_operation, df)
+                print(
+                    f"x{replicas:<4} {len(df):>9} rows | {label:<15} "
+                    f"pandas {pandas_seconds * 1000:8.2f} ms -> groups {groups_seconds * 1000:8.2f} ms "
+                    f"({pandas_seconds / groups_seconds:5.1f}x)"
+                )
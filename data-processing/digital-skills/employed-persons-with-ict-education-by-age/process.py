@@ -3,7 +3,9 @@ import os
 from ctypes import cast
 
 import pandas as pd
-from data_processing.filter import remove_non_eu_countires
+from data_processing.geo import EU28
+from data_processing.groups import group_codes, group_mask, group_nunique
+from data_processing.loader import equals, is_null, member_of, read_csv_filtered
 
 # Logger initialization
 logging.basicConfig(level=logging.DEBUG)
@@ -29,50 +31,6 @@ COLUMNS_RENAME = {
     "CONF_STATUS": "conf_status",
 }
 
-EU_COUNTRIES = [
-    "Austria",
-    "Belgium",
-    "Bulgaria",
-    "Croatia",
-    "Cyprus",
-    "Czech Republic",
-    "Denmark",
-    "Estonia",
-    "Finland",
-    "France",
-    "Germany",
-    "Greece",
-    "Hungary",
-    "Ireland",
-    "Italy",
-    "Latvia",
-    "Lithuania",
-    "Luxembourg",
-    "Malta",
-    "Netherlands",
-    "Poland",
-    "Portugal",
-    "Romania",
-    "Slovakia",
-    "Slovenia",
-    "Spain",
-    "Sweden",
-    "United Kingdom",
-    "European Union - 27 countries (from 2020)",
-    "European Union - 28 countries (2013-2020)",
-]
-
-
-def replace_str(df: pd.DataFrame, column, old_values, new_values) -> pd.DataFrame:
-    # Remove "old" from every value in "column"
-    if len(old_values) != len(new_values):
-        raise ValueError("old_values and new_values must have the same length")
-
-    for old, new in zip(old_values, new_values):
-        df[column] = df[column].str.replace(old, new, regex=False)
-
-    return df
-
 
 def filter_incomplete_entries(df: pd.DataFrame) -> pd.DataFrame:
     """
@@ -84,31 +42,21 @@ def filter_incomplete_entries(df: pd.DataFrame) -> pd.DataFrame:
     Returns:
         pd.DataFrame: A filtered DataFrame containing only valid (year, country) pairs.
     """
-    counts = df.groupby(["time_period", "geo"])["age"].nunique()
-    valid_countries = counts[counts >= 2].index
-    return df[df.set_index(["time_period", "geo"]).index.isin(valid_countries)]
+    groups = group_codes(df, ["time_period", "geo"])
+    return df[group_mask(groups, group_nunique(groups, df["age"]) >= 2)]
 
 
-df = pd.read_csv(DATASET_PATH)
+# Stream the dataset keeping only the reliable percentages of the eu countries,
+# the columns used only for filtering are dropped chunk by chunk
+df = read_csv_filtered(
+    DATASET_PATH,
+    [equals("unit", "Percentage"), member_of("geo", EU28), is_null("OBS_FLAG")],
+    select=["age", "geo", "TIME_PERIOD", "OBS_VALUE"],
+)
 
 # Rename the columns
 df.rename(columns=COLUMNS_RENAME, inplace=True)
 
-# Filter data
-df = df[df["unit"] == "Percentage"]
-
-# Remove non eu countries
-df = remove_non_eu_countires(df, "geo")
-
-# Filter out not reilable samples
-df = df[df["obs_flag"].isna()]
-
-# Drop unused columns
-df.drop(
-    columns=["dataflow", "last_update", "freq", "obs_flag", "conf_status", "unit"],
-    inplace=True,
-)
-
 # Remove rows that contain empty (NaN) values
 df = df.dropna()
 
@@ -1,7 +1,7 @@
 import os
 
-import pandas as pd
-from data_processing.filter import remove_non_eu_countires
+from data_processing.geo import EU28
+from data_processing.loader import equals, is_null, member_of, not_equals, read_csv_filtered
 
 # Read the dataset
 DATASET_NAME = "employed-persons-with-ict-education-by-att-level.csv"
@@ -11,7 +11,27 @@ PROCESSED_DATASET_PATH = os.path.join(
 )
 
 
-df = pd.read_csv(DATASET_PATH)
+# Stream the dataset keeping only the reliable percentages of the eu countries,
+# the columns used only for filtering are dropped chunk by chunk
+df = read_csv_filtered(
+    DATASET_PATH,
+    [
+        is_null("OBS_FLAG"),
+        equals("Unit of measure", "Percentage"),
+        member_of("Geopolitical entity (reporting)", EU28),
+        # Remove unused data category
+        not_equals(
+            "International Standard Classification of Education (ISCED 2011)",
+            "Upper secondary, post-secondary non-tertiary and tertiary education (levels 3-8)",
+        ),
+    ],
+    select=[
+        "International Standard Classification of Education (ISCED 2011)",
+        "Geopolitical entity (reporting)",
+        "TIME_PERIOD",
+        "OBS_VALUE",
+    ],
+)
 
 # Rename the columns
 columns_rename = {
@@ -36,39 +56,6 @@ columns_rename = {
 }
 df = df.rename(columns=columns_rename)
 
-# Filter the dataset removing not reliable data
-df = df[df["obs_flag"].isna()]
-df = df[df["unit of measure"] == "Percentage"]
-
-# Drop unuseful columns
-columns_to_drop = [
-    "structure",
-    "structure_id",
-    "structure_name",
-    "freq",
-    "time frequency",
-    "unit",
-    "unit of measure",
-    "isced11",
-    "time",
-    "geo",
-    "observation value",
-    "obs_flag",
-    "observation status (flag) v2 structure",
-    "conf_status",
-    "confidentiality status (flag)",
-]
-df = df.drop(columns=columns_to_drop)
-
-# Filter only eu countries
-df = remove_non_eu_countires(df, "country")
-
-# Remove unused data category
-df = df[
-    df["iscoe"]
-    != "Upper secondary, post-secondary non-tertiary and tertiary education (levels 3-8)"
-]
-
 # Set indexes
 df = df.set_index(["time_period", "country", "iscoe"])
 
@@ -1,5 +1,6 @@
 import os
-import shutil
+
+from data_processing.publish import sync_folder
 
 # Publish all datasets on public web app
 ########################################
@@ -10,21 +11,14 @@ CURRENT_DIRPATH = os.path.dirname(__file__)
 RELATIVE_PATH = "../../web-application/public/datasets/digital-skills"
 PUBLIC_FOLDER = os.path.join(CURRENT_DIRPATH, RELATIVE_PATH)
 
-# Get the folder and the processed datasets path to copy
+# Publish the processed datasets on the public folder: only the datasets changed
+# since the last run are published (hardlink, or copy if the folders are on different
+# file systems, then atomic rename), the datasets no longer produced are removed and
+# the public folder gets a manifest.json with the sha256 of every dataset
 #
 PROCESSED_DATASETS_FOLDER = os.path.join(CURRENT_DIRPATH, "processed_datasets")
-PROCESSED_DATASETS_NAMES = [
-    processed_dataset_name
-    for processed_dataset_name in os.listdir(PROCESSED_DATASETS_FOLDER)
-    if processed_dataset_name.endswith(".csv")
-]
-
-# Copy all the processed datasets to the public folder
-#
-for processed_dataset_name in PROCESSED_DATASETS_NAMES:
-    new_dataset_path = os.path.join(PUBLIC_FOLDER, processed_dataset_name)
-    processed_dataset_path = os.path.join(
-        PROCESSED_DATASETS_FOLDER, processed_dataset_name
-    )
 
-    shutil.copy(processed_dataset_path, new_dataset_path)
+summary = sync_folder(PROCESSED_DATASETS_FOLDER, PUBLIC_FOLDER, "*.csv")
+for status, names in summary.items():
+    for name in names:
+        print(f"{status}: {name}")
@@ -1,6 +1,13 @@
 from csv import Error
 import os
 import pandas as pd
+from data_processing.age_groups import subtract_age_band, to_survey_age_groups
+from data_processing.geo import EU28, EU_AGGREGATES, to_short_names
+from data_processing.loader import load_many, member_of, read_csv_filtered
+from data_processing.population import PopulationIndex
+from data_processing.publish import publish_csv
+from data_processing.schema import get_schema
+from data_processing.transform import replace_str
 
 class IA_CSV_ENTRIES:
     DATAFLOW = "DATAFLOW"
@@ -28,6 +35,9 @@ class ICU_CSV_ENTRIES:
     OBS_FLAG = "OBS_FLAG"
     CONF_STATUS = "CONF_STATUS"
 
+# EU members (United Kingdom included) and the EU aggregates
+EU_COUNTRIES = EU28 | EU_AGGREGATES
+
 class P_AGE_CSV_ENTRIES:
     DATAFLOW = "DATAFLOW"
     LAST_UPDATE = "LAST UPDATE"
@@ -41,46 +51,20 @@ class P_AGE_CSV_ENTRIES:
     OBS_FLAG = "OBS_FLAG"
     CONF_STATUS = "CONF_STATUS"
 
-EU_COUNTRIES = [
-    "Austria",
-    "Belgium",
-    "Bulgaria",
-    "Croatia",
-    "Cyprus",
-    "Czech Republic",
-    "Denmark",
-    "Estonia",
-    "Finland",
-    "France",
-    "Germany",
-    "Greece",
-    "Hungary",
-    "Ireland",
-    "Italy",
-    "Latvia",
-    "Lithuania",
-    "Luxembourg",
-    "Malta",
-    "Netherlands",
-    "Poland",
-    "Portugal",
-    "Romania",
-    "Slovakia",
-    "Slovenia",
-    "Spain",
-    "Sweden",
-    "United Kingdom",
-    "European Union - 27 countries (from 2020)",
-    "European Union - 28 countries (2013-2020)"
-]
 
-def load_csv(path):
-    # Read and load the dataset from the csv file
+def load_csv(path, select, predicates=()):
+    # Read and load the dataset from the csv file with the schema registered for it
+    # (compact dtypes, a missing schema is an error), keeping only the rows that
+    # satisfy the predicates and the selected columns (the file is streamed in chunks,
+    # the rows of the other countries are never held in memory)
     print("\n" + os.getcwd()
         + path)
-    return pd.read_csv(
+    return read_csv_filtered(
         os.getcwd()
         + path,
+        predicates,
+        schema=get_schema(path),
+        select=select,
         sep=",",
     )
 
@@ -95,95 +79,39 @@ def store_csv_from_datframe(dataframe: pd.DataFrame, processed_dataset_path, csv
         os.getcwd() + r"\..\web-application\public\datasets\internet-access-level\\" + csv_name
     )
 
-    dataframe.to_csv(processed_dataset_path, index=False)
-    dataframe.to_csv(web_application_path, index=False)
+    # Serialized once, the second path is a hardlink of the first one
+    publish_csv(dataframe, [processed_dataset_path, web_application_path], index=False)
 
 def correct_age_group(df_age_group: pd.DataFrame, df_age: pd.DataFrame) -> pd.DataFrame:
-    # Merge data on 'TIME_PERIOD' and 'geo', keeping only relevant age group from df_age_group
-    df_merged = df_age_group[df_age_group["age"] == "From 15 to 19 years"].merge(
-        df_age[["TIME_PERIOD", "geo", "OBS_VALUE"]], 
-        on=["TIME_PERIOD", "geo"], 
-        suffixes=("_age_group", "_age")
+    # Subtract the population of 15 years old from the age group 15-19, matching the
+    # rows on 'TIME_PERIOD' and 'geo'
+    return subtract_age_band(
+        df_age_group,
+        df_age,
+        band="From 15 to 19 years",
+        keys=[P_AGE_CSV_ENTRIES.YEAR, P_AGE_CSV_ENTRIES.COUNTRY],
     )
 
-    # Subtract OBS_VALUE_age from OBS_VALUE_age_group
-    df_merged["OBS_VALUE_age_group"] -= df_merged["OBS_VALUE_age"]
-
-    # Drop the extra column
-    df_merged = df_merged.drop(columns=["OBS_VALUE_age"])
-
-    # Rename column back to original
-    df_merged = df_merged.rename(columns={"OBS_VALUE_age_group": "OBS_VALUE"})
-
-    # Update original df_csv2 by replacing the values for the matching rows
-    df_age_group.update(df_merged)
-
-    return df_age_group
-
 def merge_population_age_group(df: pd.DataFrame) -> pd.DataFrame:
-    # Define age groupings ("From 15 to 19 years" here it's actually "From 16 to 19 years")
-    age_groups = {
-        "From 15 to 19 years": "Individuals, 16 to 24 years old",
-        "From 20 to 24 years": "Individuals, 16 to 24 years old",
-
-        "From 25 to 29 years": "Individuals, 25 to 54 years old",
-        "From 30 to 34 years": "Individuals, 25 to 54 years old",
-        "From 35 to 39 years": "Individuals, 25 to 54 years old",
-        "From 40 to 44 years": "Individuals, 25 to 54 years old",
-        "From 45 to 49 years": "Individuals, 25 to 54 years old",
-        "From 50 to 54 years": "Individuals, 25 to 54 years old",
-
-        "From 55 to 59 years": "Individuals, 55 to 74 years old",
-        "From 60 to 64 years": "Individuals, 55 to 74 years old",
-        "From 65 to 69 years": "Individuals, 55 to 74 years old",
-        "From 70 to 74 years": "Individuals, 55 to 74 years old",
-    }
-
-    # Map age values to new merged groups
-    df["merged_age_group"] = df["age"].replace(age_groups)
-
-    # Group by TIME_PERIOD, geo, and merged age group, summing OBS_VALUE
-    df_merged = (
-        df.groupby(["TIME_PERIOD", "geo", "merged_age_group"], as_index=False)
-        .agg({"OBS_VALUE": "sum", "DATAFLOW": "first", "LAST UPDATE": "first", "freq": "first", 
-            "unit": "first", "sex": "first", "OBS_FLAG": "first", "CONF_STATUS": "first"})
-    )
-
-    # Rename column back to "age"
-    df_merged.rename(columns={"merged_age_group": "age"}, inplace=True)
-
-    # Change values in "age" column
-    df_merged["age"] = df_merged["age"].replace("75 years or over", "Individuals, 75 years old or more")
-
-    return df_merged
-
-def merge_population_internet_usage(df_p: pd.DataFrame, df_iu: pd.DataFrame) -> pd.DataFrame:
-    # Rename columns in df_population to match df_internet
-    df_p.rename(columns={P_AGE_CSV_ENTRIES.OBS_VALUE: "Population"}, inplace=True)
-
-    # Merge on Year, Country, and Age Group
-    df_merged = df_iu.merge(
-    df_p[[P_AGE_CSV_ENTRIES.YEAR, P_AGE_CSV_ENTRIES.COUNTRY, P_AGE_CSV_ENTRIES.AGE, "Population"]],
-    left_on=[ICU_CSV_ENTRIES.YEAR, ICU_CSV_ENTRIES.COUNTRY, ICU_CSV_ENTRIES.INDIVIDUAL_TYPE], 
-    right_on=[P_AGE_CSV_ENTRIES.YEAR, P_AGE_CSV_ENTRIES.COUNTRY, P_AGE_CSV_ENTRIES.AGE],
-    how="left"
-    )
-
-    # Drop duplicate Age column
-    df_merged.drop(columns=[P_AGE_CSV_ENTRIES.AGE], inplace=True)
-
-    return df_merged
-    
-
-def replace_str(df: pd.DataFrame, column, old_values, new_values) -> pd.DataFrame:
-    # Remove "old" from every value in "column"
-    if len(old_values) != len(new_values):
-        raise ValueError("old_values and new_values must have the same length")
-
-    for old, new in zip(old_values, new_values):
-        df[column] = df[column].str.replace(old, new, regex=False)
-
-    return df
+    # Sum the population of the age bands in the age groups of the internet use datasets
+    # ("From 15 to 19 years" here it's actually "From 16 to 19 years"), only the year,
+    # the country, the age group and the population are kept
+    return to_survey_age_groups(df, keys=[P_AGE_CSV_ENTRIES.YEAR, P_AGE_CSV_ENTRIES.COUNTRY])
+
+def process_internet_use_age_education(df: pd.DataFrame, strings: list) -> pd.DataFrame:
+    # The same steps of the internet use divided by age group, without the population
+    df = replace_str(df, ICU_CSV_ENTRIES.CATEGORY, strings, ["", ""])
+    df = replace_str(df, ICU_CSV_ENTRIES.INDIVIDUAL_TYPE, ["Individuals, "], [""])
+    df[ICU_CSV_ENTRIES.COUNTRY] = to_short_names(df[ICU_CSV_ENTRIES.COUNTRY])
+    df = df.sort_values(by=[ICU_CSV_ENTRIES.YEAR, ICU_CSV_ENTRIES.COUNTRY])
+    df = df.dropna()
+    return df.rename(columns={
+        ICU_CSV_ENTRIES.COUNTRY: "Country",
+        ICU_CSV_ENTRIES.YEAR: "Year",
+        ICU_CSV_ENTRIES.CATEGORY: "Last internet use",
+        ICU_CSV_ENTRIES.INDIVIDUAL_TYPE: "Age and education",
+        ICU_CSV_ENTRIES.OBS_VALUE: "Value"
+    })
 
 if __name__ == "__main__":
     # Define paths
@@ -203,15 +131,45 @@ if __name__ == "__main__":
     cu_divided_by_age_group_pd_path = r"\internet-access-level\datasets\processed-datasets\computer-use-divided-by-age-group.csv"
     iu_pd_path = r"\internet-access-level\datasets\processed-datasets\internet-use.csv"
 
-    # Load csv
-    df_ia = load_csv(ia_path)
-    df_ia_reasons = load_csv(ia_reasons_path)
-    df_iu_age_edu = load_csv(iu_divided_by_edu_age_path)
-    df_iu_age_group = load_csv(iu_divided_by_age_group_path)
-    df_cu_age_group = load_csv(cu_divided_by_age_group_path)
-    df_iu = load_csv(iu_path)
-    df_p_age15 = load_csv(p_age_15_path)
-    df_p_age_group = load_csv(p_age_group_path)
+    # Load csv (all the files at once), removing while reading the countries that are
+    # not in our interest (the population is needed for every country of the internet
+    # use datasets)
+    # Only the columns used by the pipeline are read (if the other ones were kept the
+    # 'dropna' below would remove every row, 'OBS_FLAG' and 'CONF_STATUS' are mostly empty)
+    ia_columns = [IA_CSV_ENTRIES.COUNTRY, IA_CSV_ENTRIES.YEAR, IA_CSV_ENTRIES.OBS_VALUE]
+    ia_reasons_columns = [IA_CSV_ENTRIES.CATEGORY, *ia_columns]
+    icu_columns = [ICU_CSV_ENTRIES.COUNTRY, ICU_CSV_ENTRIES.YEAR, ICU_CSV_ENTRIES.OBS_VALUE]
+    icu_age_columns = [ICU_CSV_ENTRIES.CATEGORY, ICU_CSV_ENTRIES.INDIVIDUAL_TYPE, *icu_columns]
+    p_age_15_columns = [P_AGE_CSV_ENTRIES.COUNTRY, P_AGE_CSV_ENTRIES.YEAR, P_AGE_CSV_ENTRIES.OBS_VALUE]
+    p_age_group_columns = [P_AGE_CSV_ENTRIES.AGE, *p_age_15_columns]
+
+    ia_countries = [member_of(IA_CSV_ENTRIES.COUNTRY, EU_COUNTRIES)]
+    icu_countries = [member_of(ICU_CSV_ENTRIES.COUNTRY, EU_COUNTRIES)]
+    sources = {
+        "ia": (ia_path, {"select": ia_columns, "predicates": ia_countries}),
+        "ia_reasons": (ia_reasons_path, {"select": ia_reasons_columns, "predicates": ia_countries}),
+        "iu_age_group": (iu_divided_by_age_group_path, {"select": icu_age_columns, "predicates": icu_countries}),
+        "cu_age_group": (cu_divided_by_age_group_path, {"select": icu_age_columns, "predicates": icu_countries}),
+        "iu": (iu_path, {"select": icu_columns, "predicates": icu_countries}),
+        "p_age15": (p_age_15_path, {"select": p_age_15_columns}),
+        "p_age_group": (p_age_group_path, {"select": p_age_group_columns}),
+    }
+    # The original of the internet use divided by age and education level is not in
+    # the repository: without it the processed dataset already published is kept
+    if os.path.exists(os.getcwd() + iu_divided_by_edu_age_path):
+        sources["iu_age_edu"] = (iu_divided_by_edu_age_path, {"select": icu_age_columns, "predicates": icu_countries})
+    else:
+        print("\nSkipped (missing original dataset): " + iu_divided_by_edu_age_path)
+    frames = load_many(sources, load_csv)
+    print(frames.report())
+    df_ia = frames["ia"]
+    df_ia_reasons = frames["ia_reasons"]
+    df_iu_age_edu = frames.get("iu_age_edu")
+    df_iu_age_group = frames["iu_age_group"]
+    df_cu_age_group = frames["cu_age_group"]
+    df_iu = frames["iu"]
+    df_p_age15 = frames["p_age15"]
+    df_p_age_group = frames["p_age_group"]
 
     # Subtract the population of 15 years old from the age group 15-19
     df_p_age_group = correct_age_group(df_p_age_group, df_p_age15)
@@ -219,76 +177,23 @@ if __name__ == "__main__":
     # Merge population age groups to match the age groups of the internet use datasets
     df_p_age_group = merge_population_age_group(df_p_age_group)
 
-    # Merge population and internet usage and computer usage datasets
-    df_iu_age_group = merge_population_internet_usage(df_p_age_group, df_iu_age_group)
-    df_cu_age_group = merge_population_internet_usage(df_p_age_group, df_cu_age_group)
-
-    # Remove the columns that we are not interested in
-    df_ia = df_ia.drop([
-        IA_CSV_ENTRIES.DATAFLOW,
-        IA_CSV_ENTRIES.LAST_UPDATE,
-        IA_CSV_ENTRIES.FREQ,
-        IA_CSV_ENTRIES.UNIT,
-        IA_CSV_ENTRIES.HHTYP,
-        IA_CSV_ENTRIES.OBS_FLAG,
-        IA_CSV_ENTRIES.CONF_STATUS], axis=1)
-    
-    df_ia_reasons =  df_ia_reasons.drop([
-        IA_CSV_ENTRIES.DATAFLOW,
-        IA_CSV_ENTRIES.LAST_UPDATE,
-        IA_CSV_ENTRIES.FREQ,
-        IA_CSV_ENTRIES.UNIT,
-        IA_CSV_ENTRIES.HHTYP,
-        IA_CSV_ENTRIES.OBS_FLAG,
-        IA_CSV_ENTRIES.CONF_STATUS], axis=1)
-
-    df_iu_age_edu = df_iu_age_edu.drop([
-        ICU_CSV_ENTRIES.DATAFLOW,
-        ICU_CSV_ENTRIES.LAST_UPDATE,
-        ICU_CSV_ENTRIES.FREQ,
-        ICU_CSV_ENTRIES.UNIT,
-        ICU_CSV_ENTRIES.OBS_FLAG,
-        ICU_CSV_ENTRIES.CONF_STATUS], axis=1)
-    
-    df_iu_age_group = df_iu_age_group.drop([
-        ICU_CSV_ENTRIES.DATAFLOW,
-        ICU_CSV_ENTRIES.LAST_UPDATE,
-        ICU_CSV_ENTRIES.FREQ,
-        ICU_CSV_ENTRIES.UNIT,
-        ICU_CSV_ENTRIES.OBS_FLAG,
-        ICU_CSV_ENTRIES.CONF_STATUS], axis=1)
-    
-    df_cu_age_group = df_cu_age_group.drop([
-        ICU_CSV_ENTRIES.DATAFLOW,
-        ICU_CSV_ENTRIES.LAST_UPDATE,
-        ICU_CSV_ENTRIES.FREQ,
-        ICU_CSV_ENTRIES.UNIT,
-        ICU_CSV_ENTRIES.OBS_FLAG,
-        ICU_CSV_ENTRIES.CONF_STATUS], axis=1)
-    
-    df_iu = df_iu.drop([
-        ICU_CSV_ENTRIES.DATAFLOW,
-        ICU_CSV_ENTRIES.LAST_UPDATE,
-        ICU_CSV_ENTRIES.FREQ,
-        ICU_CSV_ENTRIES.CATEGORY,
-        ICU_CSV_ENTRIES.UNIT,
-        ICU_CSV_ENTRIES.INDIVIDUAL_TYPE,
-        ICU_CSV_ENTRIES.OBS_FLAG,
-        ICU_CSV_ENTRIES.CONF_STATUS], axis=1)
-
-    # Remove the countries that are not in our interest
-    df_ia = df_ia.query(f"{IA_CSV_ENTRIES.COUNTRY} in {EU_COUNTRIES}")
-    df_ia_reasons = df_ia_reasons.query(f"{IA_CSV_ENTRIES.COUNTRY} in {EU_COUNTRIES}")
-    df_iu_age_edu = df_iu_age_edu.query(f"{ICU_CSV_ENTRIES.COUNTRY} in {EU_COUNTRIES}")
-    df_iu_age_group = df_iu_age_group.query(f"{ICU_CSV_ENTRIES.COUNTRY} in {EU_COUNTRIES}")
-    df_cu_age_group = df_cu_age_group.query(f"{ICU_CSV_ENTRIES.COUNTRY} in {EU_COUNTRIES}")
-    df_iu = df_iu.query(f"{ICU_CSV_ENTRIES.COUNTRY} in {EU_COUNTRIES}")
+    # Add the population to the internet usage and computer usage datasets, matching
+    # Year, Country, and Age Group (the lookup index is built once for both)
+    population = PopulationIndex(
+        df_p_age_group,
+        [P_AGE_CSV_ENTRIES.YEAR, P_AGE_CSV_ENTRIES.COUNTRY, P_AGE_CSV_ENTRIES.AGE],
+        P_AGE_CSV_ENTRIES.OBS_VALUE,
+    )
+    population_keys = [ICU_CSV_ENTRIES.YEAR, ICU_CSV_ENTRIES.COUNTRY, ICU_CSV_ENTRIES.INDIVIDUAL_TYPE]
+    df_iu_age_group = population.attach(df_iu_age_group, population_keys, "Population")
+    df_cu_age_group = population.attach(df_cu_age_group, population_keys, "Population")
 
     # Remove "Last internet use: " and "internet use: " from every value in the column 'ICU_CSV_ENTRIES.CATEGORY'
     strings = ["Last internet use: ",
                "Internet use: "]
     df_iu_age_group = replace_str(df_iu_age_group, ICU_CSV_ENTRIES.CATEGORY, strings, ["", ""])
-    df_iu_age_edu = replace_str(df_iu_age_edu, ICU_CSV_ENTRIES.CATEGORY, strings, ["", ""])
+    if df_iu_age_edu is not None:
+        df_iu_age_edu = process_internet_use_age_education(df_iu_age_edu, strings)
 
     # Remove "Last computer use: ", "Individuals who used a computer " and "Computer use: " from every value in the column 'ICU_CSV_ENTRIES.CATEGORY'
     strings = ["Last computer use: ",
@@ -300,7 +205,6 @@ if __name__ == "__main__":
     # Remove "individuals, " from the IU_CSV_ENTRIES.INDIVIDUAL_TYPE column.
     str1 = "Individuals, "
     df_iu_age_group = replace_str(df_iu_age_group, ICU_CSV_ENTRIES.INDIVIDUAL_TYPE, [str1], [""])
-    df_iu_age_edu = replace_str(df_iu_age_edu, ICU_CSV_ENTRIES.INDIVIDUAL_TYPE, [str1], [""])
     df_cu_age_group = replace_str(df_cu_age_group, ICU_CSV_ENTRIES.INDIVIDUAL_TYPE, [str1], [""])
 
     # Change values of IA_CSV_ENTRIES.CATEGORY column for better display
@@ -327,22 +231,15 @@ if __name__ == "__main__":
     df_ia_reasons = replace_str(df_ia_reasons, IA_CSV_ENTRIES.CATEGORY, oldStrings, newStrings)
 
     # Change entities names into their short version for better display
-    oldStrings = ["European Union - 27 countries (from 2020)",
-                  "European Union - 28 countries (2013-2020)"]
-    newStrings = ["EU-27(from 2020)",
-                  "EU-28(2013-2020)"]
-
-    df_ia = replace_str(df_ia, IA_CSV_ENTRIES.COUNTRY, oldStrings, newStrings)
-    df_ia_reasons = replace_str(df_ia_reasons, IA_CSV_ENTRIES.COUNTRY, oldStrings, newStrings)
-    df_iu_age_edu = replace_str(df_iu_age_edu, ICU_CSV_ENTRIES.COUNTRY, oldStrings, newStrings)
-    df_iu_age_group = replace_str(df_iu_age_group, ICU_CSV_ENTRIES.COUNTRY, oldStrings, newStrings)
-    df_cu_age_group = replace_str(df_cu_age_group, ICU_CSV_ENTRIES.COUNTRY, oldStrings, newStrings)
-    df_iu = replace_str(df_iu, ICU_CSV_ENTRIES.COUNTRY, oldStrings, newStrings)
+    df_ia[IA_CSV_ENTRIES.COUNTRY] = to_short_names(df_ia[IA_CSV_ENTRIES.COUNTRY])
+    df_ia_reasons[IA_CSV_ENTRIES.COUNTRY] = to_short_names(df_ia_reasons[IA_CSV_ENTRIES.COUNTRY])
+    df_iu_age_group[ICU_CSV_ENTRIES.COUNTRY] = to_short_names(df_iu_age_group[ICU_CSV_ENTRIES.COUNTRY])
+    df_cu_age_group[ICU_CSV_ENTRIES.COUNTRY] = to_short_names(df_cu_age_group[ICU_CSV_ENTRIES.COUNTRY])
+    df_iu[ICU_CSV_ENTRIES.COUNTRY] = to_short_names(df_iu[ICU_CSV_ENTRIES.COUNTRY])
 
     # Sort the dataframe by year and country
     df_ia = df_ia.sort_values(by=[IA_CSV_ENTRIES.YEAR, IA_CSV_ENTRIES.COUNTRY])
     df_ia_reasons = df_ia_reasons.sort_values(by=[IA_CSV_ENTRIES.YEAR, IA_CSV_ENTRIES.COUNTRY])
-    df_iu_age_edu = df_iu_age_edu.sort_values(by=[ICU_CSV_ENTRIES.YEAR, ICU_CSV_ENTRIES.COUNTRY])
     df_iu_age_group = df_iu_age_group.sort_values(by=[ICU_CSV_ENTRIES.YEAR, ICU_CSV_ENTRIES.COUNTRY])
     df_cu_age_group = df_cu_age_group.sort_values(by=[ICU_CSV_ENTRIES.YEAR, ICU_CSV_ENTRIES.COUNTRY])
     df_iu = df_iu.sort_values(by=[ICU_CSV_ENTRIES.YEAR, ICU_CSV_ENTRIES.COUNTRY])
@@ -351,7 +248,6 @@ if __name__ == "__main__":
     df_ia = df_ia.dropna()
     df_ia_reasons = df_ia_reasons.dropna()
     df_iu_age_group = df_iu_age_group.dropna()
-    df_iu_age_edu = df_iu_age_edu.dropna()
     df_cu_age_group = df_cu_age_group.dropna()
     df_iu = df_iu.dropna()
 
@@ -367,13 +263,6 @@ if __name__ == "__main__":
         IA_CSV_ENTRIES.CATEGORY: "Reason",
         IA_CSV_ENTRIES.OBS_VALUE: "Value"
     })
-    df_iu_age_edu = df_iu_age_edu.rename(columns={
-        ICU_CSV_ENTRIES.COUNTRY: "Country",
-        ICU_CSV_ENTRIES.YEAR: "Year",
-        ICU_CSV_ENTRIES.CATEGORY: "Last internet use",
-        ICU_CSV_ENTRIES.INDIVIDUAL_TYPE: "Age and education",
-        ICU_CSV_ENTRIES.OBS_VALUE: "Value"
-    })
     df_iu_age_group = df_iu_age_group.rename(columns={
         ICU_CSV_ENTRIES.COUNTRY: "Country",
         ICU_CSV_ENTRIES.YEAR: "Year",
@@ -396,7 +285,8 @@ if __name__ == "__main__":
 
     store_csv_from_datframe(df_ia, ia_pd_path, "internet-access.csv")
     store_csv_from_datframe(df_ia_reasons, ia_reasons_pd_path, "reasons-not-have-internet-access.csv")
-    store_csv_from_datframe(df_iu_age_edu, iu_divided_by_edu_age_pd_path, "internet-use-divided-by-age-education-level.csv")
+    if df_iu_age_edu is not None:
+        store_csv_from_datframe(df_iu_age_edu, iu_divided_by_edu_age_pd_path, "internet-use-divided-by-age-education-level.csv")
     store_csv_from_datframe(df_iu_age_group, iu_divided_by_age_group_pd_path, "internet-use-divided-by-age-group.csv")
     store_csv_from_datframe(df_cu_age_group, cu_divided_by_age_group_pd_path, "computer-use-divided-by-age-group.csv")
     store_csv_from_datframe(df_iu, iu_pd_path, "internet-use.csv")
\ No newline at end of file
@@ -0,0 +1,270 @@
+import argparse
+import glob
+import importlib.util
+import os
+import sys
+import time
+
+from data_processing.pipeline import (
+    SUCCEEDED,
+    BuildManifest,
+    Pipeline,
+    format_summary,
+    run_pipelines,
+)
+
+# Rebuild all the processed datasets
+####################################
+
+# Usage: python run-all.py [pipeline names...] [--workers N] [--verbose] [--force]
+#
+# The pipelines are run in dependency order (inferred from the declared inputs and
+# outputs) and the independent ones in parallel, each script in its own process.
+# A pipeline is skipped when its script, code, inputs and arguments did not change
+# since its last successful run (see BUILD_MANIFEST), use --force to run it anyway.
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+WEB_APPLICATION_DATASETS = os.path.join(ROOT, "..", "web-application", "public", "datasets")
+BUILD_MANIFEST = os.path.join(ROOT, ".build-manifest.json")
+
+
+def path(*parts: str) -> str:
+    return os.path.join(ROOT, *parts)
+
+
+# The shared package, part of the code of every pipeline that imports it
+PACKAGE_CODE = tuple(sorted(glob.glob(path("data_processing", "data_processing", "*.py"))))
+
+
+# Declare every pipeline with the files it reads and writes
+#
+ASSIGNMENT_4_DATASETS = path("assignment-4", "processed-datasets")
+ASSIGNMENT_4_NAMES = [
+    "climate-cube.npy",
+    "climate-cube.json",
+    "Max.csv",
+    "Min.csv",
+    "Avg.csv",
+    # Chart-ready files of the radar and ridgeline charts
+    "Radar.csv",
+    "Ridgeline.csv",
+    "Ridgeline-density.csv",
+    # Levels of detail of the monthly series (see LOD_LEVELS in Preprocess_data.py)
+    *(f"{element}-{level}.csv" for element in ("Max", "Min", "Avg") for level in (200, 800)),
+]
+INTERNET_ACCESS_DATASETS = path("internet-access-level", "datasets")
+INTERNET_ACCESS_NAMES = [
+    "internet-access.csv",
+    "reasons-not-have-internet-access.csv",
+    "internet-use-divided-by-age-group.csv",
+    "computer-use-divided-by-age-group.csv",
+    "internet-use.csv",
+]
+# The original of this dataset is not in the repository, the script processes it (and
+# the pipeline declares it) only when it is there
+if os.path.exists(
+    os.path.join(INTERNET_ACCESS_DATASETS, "original-datasets", "internet-use-divided-by-age-education-level.csv")
+):
+    INTERNET_ACCESS_NAMES.append("internet-use-divided-by-age-education-level.csv")
+INTERNET_ACCESS_POPULATION_NAMES = [
+    "population-age-15.csv",
+    "population-divided-by-age-group.csv",
+]
+USE_OF_THE_INTERNET_NAMES = [
+    os.path.join("frequencies", "freq.csv"),
+    os.path.join("activities", "percentage_people_good_and_services.csv"),
+    os.path.join("degrading", "percentage_people_degrading_online_mex.csv"),
+    os.path.join("purchase", "percentage_purchase_last_3_month_2019.csv"),
+    os.path.join("financial", "population_eu.csv"),
+    os.path.join("financial", "percentage_Individuals_bought_or_sold shares_or_other_investiment.csv"),
+]
+DIGITAL_SKILLS_PROCESSED = path("digital-skills", "processed_datasets")
+DIGITAL_SKILLS_NAMES = {
+    "digital-skills-by-individuals-level": "individual-level-of-digital-skills-2021.csv",
+    "employed-persons-with-ict-education-by-age": "employed-persons-with-ict-education-by-age.csv",
+    "employed-persons-with-ict-education-by-att-level": "employed-persons-with-ict-education-by-att-level.csv",
+    "employed-persons-with-ict-education-by-sex": "employed-persons-with-ict-education-by-sex.csv",
+}
+# The original of a dataset may not be in the repository (e.g. the individual level of
+# digital skills): its processor is registered only when it is there, the processed
+# dataset already in the repository is published anyway
+DIGITAL_SKILLS_PROCESSORS = {
+    folder: name
+    for folder, name in DIGITAL_SKILLS_NAMES.items()
+    if os.path.exists(path("digital-skills", folder, name))
+}
+# The modules needed by the pipelines that are not in requirements.txt (the notebooks
+# are executed with Jupyter), without them the pipeline is skipped
+OPTIONAL_MODULES = {
+    "use-of-the-internet": ("nbconvert", "ipykernel"),
+}
+
+PIPELINES = [
+    Pipeline(
+        "assignment-1",
+        path("assignment-1", "scripts", "co2-fossil-plus-land-use-processing.py"),
+        cwd=ROOT,
+        code=PACKAGE_CODE,
+        inputs=(path("assignment-1", "datasets", "original-datasets", "co2-fossil-plus-land-use.csv"),),
+        outputs=(
+            path("assignment-1", "datasets", "processed-datasets", "eu-countries-emission-including-land-usage.csv"),
+        ),
+    ),
+    Pipeline(
+        "assignment-2",
+        path("assignment-2", "scripts", "energy-consuption-eu-27.py"),
+        cwd=ROOT,
+        code=PACKAGE_CODE,
+        inputs=(
+            path("assignment-2", "datasets", "original-datasets", "energy-consumption-by-source-and-country.csv"),
+        ),
+        outputs=(
+            path("assignment-2", "datasets", "processed-datasets", "eu-27-countries-energy-consumption-by-source.csv"),
+        ),
+    ),
+    Pipeline(
+        "assignment-3",
+        path("assignment-3", "scripts", "co2-emission-world.py"),
+        cwd=path("assignment-3", "scripts"),
+        code=PACKAGE_CODE,
+        inputs=tuple(
+            path("assignment-3", "original-datasets", name)
+            for name in (
+                "co2-emissions-per-capita.csv",
+                "co2-fossil-plus-land-use.csv",
+                "land-area-km.csv",
+                "annual-co2-emissions-per-country.csv",
+            )
+        ),
+        outputs=(path("assignment-3", "processed-datasets", "World-data.csv"),),
+    ),
+    Pipeline(
+        "assignment-4",
+        path("assignment-4", "Preprocess_data.py"),
+        cwd=path("assignment-4"),
+        code=(
+            path("assignment-4", "climate_cube.py"),
+            path("assignment-4", "original-datasets", "country_indexes.py"),
+            *PACKAGE_CODE,
+        ),
+        inputs=tuple(
+            path("assignment-4", "original-datasets", name) for name in ("Max.txt", "Min.txt", "Avg.txt")
+        ),
+        outputs=tuple(os.path.join(ASSIGNMENT_4_DATASETS, name) for name in ASSIGNMENT_4_NAMES),
+    ),
+    Pipeline(
+        "internet-access-level",
+        path("internet-access-level", "scripts", "preprocess-data.py"),
+        cwd=ROOT,
+        code=PACKAGE_CODE,
+        inputs=tuple(
+            os.path.join(INTERNET_ACCESS_DATASETS, "original-datasets", name)
+            for name in INTERNET_ACCESS_NAMES + INTERNET_ACCESS_POPULATION_NAMES
+        ),
+        outputs=tuple(
+            os.path.join(INTERNET_ACCESS_DATASETS, "processed-datasets", name) for name in INTERNET_ACCESS_NAMES
+        ),
+    ),
+    Pipeline(
+        "use-of-the-internet",
+        path("use-of-the-internet", "preprocess_data.ipynb"),
+        cwd=path("use-of-the-internet"),
+        inputs=tuple(
+            sorted(glob.glob(path("use-of-the-internet", "original-datasets", "*", "*.csv")))
+        ),
+        outputs=tuple(
+            path("use-of-the-internet", "preprocessed_data", name) for name in USE_OF_THE_INTERNET_NAMES
+        ),
+        # The notebook is executed in memory, the executed copy is printed in the log
+        command=(sys.executable, "-m", "jupyter", "nbconvert", "--to", "notebook", "--execute", "--stdout"),
+    ),
+    *(
+        Pipeline(
+            folder,
+            path("digital-skills", folder, "process.py"),
+            cwd=path("digital-skills", folder),
+            code=PACKAGE_CODE,
+            inputs=(path("digital-skills", folder, name),),
+            outputs=(os.path.join(DIGITAL_SKILLS_PROCESSED, name),),
+        )
+        for folder, name in DIGITAL_SKILLS_PROCESSORS.items()
+    ),
+    Pipeline(
+        "digital-skills-publish",
+        path("digital-skills", "publish-all.py"),
+        cwd=path("digital-skills"),
+        code=PACKAGE_CODE,
+        inputs=tuple(os.path.join(DIGITAL_SKILLS_PROCESSED, name) for name in DIGITAL_SKILLS_NAMES.values()),
+        outputs=tuple(
+            os.path.join(WEB_APPLICATION_DATASETS, "digital-skills", name)
+            for name in [*DIGITAL_SKILLS_NAMES.values(), "manifest.json"]
+        ),
+    ),
+]
+
+
+def select_pipelines(names: list) -> list:
+    # The selected pipelines (all if no name is given), each one with what it depends on
+    if not names:
+        return PIPELINES
+
+    by_output = {
+        os.path.abspath(output): pipeline for pipeline in PIPELINES for output in pipeline.outputs
+    }
+    by_name = {pipeline.name: pipeline for pipeline in PIPELINES}
+    unknown = set(names) - set(by_name)
+    if unknown:
+        raise SystemExit(f"Unknown pipelines: {', '.join(sorted(unknown))}")
+
+    selected = set()
+    pending = list(names)
+    while pending:
+        name = pending.pop()
+        if name in selected:
+            continue
+        selected.add(name)
+        for input_path in by_name[name].inputs:
+            producer = by_output.get(os.path.abspath(input_path))
+            if producer is not None:
+                pending.append(producer.name)
+
+    return [pipeline for pipeline in PIPELINES if pipeline.name in selected]
+
+
+def available_pipelines(pipelines: list) -> list:
+    # The pipelines whose optional modules are installed, a message for the other ones
+    available = []
+    for pipeline in pipelines:
+        missing = [
+            module for module in OPTIONAL_MODULES.get(pipeline.name, ()) if importlib.util.find_spec(module) is None
+        ]
+        if missing:
+            print(f"Skipped {pipeline.name}: it needs {', '.join(missing)} (pip install {' '.join(missing)})")
+        else:
+            available.append(pipeline)
+    return available
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the processed datasets")
+    parser.add_argument("pipelines", nargs="*", help="The pipelines to run (default all)")
+    parser.add_argument("--workers", type=int, default=None, help="Pipelines run at once")
+    parser.add_argument("--verbose", action="store_true", help="Print the output of every script")
+    parser.add_argument("--force", action="store_true", help="Run also the pipelines that are up to date")
+    args = parser.parse_args()
+
+    pipelines = available_pipelines(select_pipelines(args.pipelines))
+
+    start = time.perf_counter()
+    results = run_pipelines(
+        pipelines,
+        max_workers=args.workers,
+        verbose=args.verbose,
+        manifest=BuildManifest(BUILD_MANIFEST),
+        force=args.force,
+    )
+    print()
+    print(format_summary(pipelines, results, time.perf_counter() - start))
+
+    if any(result.status != SUCCEEDED for result in results.values()):
+        sys.exit(1)